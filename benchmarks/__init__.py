@@ -0,0 +1,3 @@
+"""
+End-to-end benchmarks for MCP CLI, run with ``python -m benchmarks``.
+"""
@@ -0,0 +1,366 @@
+"""
+End-to-end benchmarks for MCP CLI.
+
+Runs queries through the real ``mcp_cli`` code paths against the stub MCP
+server in ``stub_server.py`` and the scripted model in ``scripted_llm.py``,
+so no network access, Node or OpenAI key is needed and every run does the
+same work. The configuration lives in a temporary ``MCP_CLI_HOME``, so the
+user's own configuration and caches are left alone.
+
+Scenarios:
+    cold_query: ``run_query`` with the session pool emptied first, so the
+        server is started for every query
+    warm_query: ``run_query`` on a pooled session
+    list_tools_cold, list_tools_warm, list_tools_cached: ``list_tools``
+        starting the server, on a pooled session, and from the tool cache
+    api_throughput: ``POST /api/query`` against an in-process API server
+        at each ``--concurrency`` level
+
+Usage::
+
+    python -m benchmarks run --iterations 20 --output before.json
+    python -m benchmarks compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from mcp_cli.loadgen import percentile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+STUB_SERVER = os.path.join(BENCHMARKS_DIR, "stub_server.py")
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+SERVER_NAME = "stub"
+MODEL_NAME = "scripted"
+QUERY = "Look up the benchmark keys and summarize them."
+
+SCENARIOS = ["cold_query", "warm_query", "list_tools", "api_throughput"]
+
+
+def summarize(durations: List[float], errors: int = 0) -> Dict[str, Any]:
+    """Summarize latencies in seconds."""
+    values = sorted(durations)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "mean": sum(values) / len(values) if values else 0.0,
+        "min": values[0] if values else 0.0,
+        "p50": percentile(values, 0.50),
+        "p90": percentile(values, 0.90),
+        "p99": percentile(values, 0.99),
+        "max": values[-1] if values else 0.0
+    }
+
+
+def setup_home(args: argparse.Namespace) -> str:
+    """Create a temporary MCP CLI home configured with the stub server."""
+    home = tempfile.mkdtemp(prefix="mcp-cli-bench-")
+    os.makedirs(os.path.join(home, "config"))
+    config = {
+        "mcpServers": {
+            SERVER_NAME: {
+                "command": sys.executable,
+                "args": [
+                    STUB_SERVER,
+                    "--tools", str(args.tools),
+                    "--latency", str(args.tool_latency),
+                    "--payload-size", str(args.payload_size)
+                ],
+                "maxConcurrency": max(args.concurrency)
+            }
+        }
+    }
+    with open(os.path.join(home, "config", "config.json"), "w") as f:
+        json.dump(config, f, indent=2)
+
+    os.environ["MCP_CLI_HOME"] = home
+    # Queries check for a key before running; the scripted model never uses it
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    # Keep mcp_use from sending telemetry in the middle of timed runs
+    os.environ.setdefault("MCP_USE_ANONYMIZED_TELEMETRY", "false")
+    return home
+
+
+def quiet_logging():
+    """Silence the per-step and per-request INFO logs that would flood the output."""
+    # mcp_use configures its loggers when imported, so import it first
+    import mcp_use  # noqa: F401
+
+    for name in ("mcp_use", "werkzeug", "mcp_cli.api.server", "mcp_cli.pool"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def make_model(args: argparse.Namespace):
+    from benchmarks.scripted_llm import ScriptedChatModel, tool_script
+
+    return ScriptedChatModel(script=tool_script(args.tool_calls, args.tools), latency=args.llm_latency)
+
+
+async def register_model(args: argparse.Namespace):
+    """Serve ``MODEL_NAME`` with the scripted model on the running event loop."""
+    from mcp_cli.core import load_config
+    from mcp_cli.llm import get_llm_registry
+
+    get_llm_registry(load_config(readonly=True).get("llm")).register(MODEL_NAME, make_model(args))
+
+
+async def measure(iterations: int, run: Callable[[], Any], before: Optional[Callable[[], Any]] = None,
+                  failed: Callable[[Any], bool] = lambda result: False) -> Dict[str, Any]:
+    """Time ``iterations`` awaited calls of ``run``, calling ``before`` untimed ahead of each."""
+    durations = []
+    errors = 0
+    for _ in range(iterations):
+        if before is not None:
+            await before()
+        start = time.perf_counter()
+        try:
+            # Results are printed by run_query and list_tools; keep the output quiet
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = await run()
+            if failed(result):
+                errors += 1
+                continue
+        except Exception:
+            errors += 1
+            continue
+        durations.append(time.perf_counter() - start)
+    return summarize(durations, errors)
+
+
+async def run_local_scenarios(args: argparse.Namespace, scenarios: List[str]) -> Dict[str, Any]:
+    from mcp_cli.core import close_session_pool, list_tools, run_query
+
+    await register_model(args)
+    results = {}
+
+    def query():
+        return run_query(SERVER_NAME, QUERY, MODEL_NAME, return_result=True, use_cache=False)
+
+    def is_error(result):
+        return not isinstance(result, str) or result.startswith("Error")
+
+    try:
+        # One untimed query loads langchain and mcp_use, which are imported lazily
+        await measure(1, query, before=close_session_pool)
+
+        if "cold_query" in scenarios:
+            results["cold_query"] = await measure(args.iterations, query, before=close_session_pool, failed=is_error)
+
+        if "warm_query" in scenarios:
+            # One untimed query starts the server and fills the pool
+            await measure(1, query)
+            results["warm_query"] = await measure(args.iterations, query, failed=is_error)
+
+        if "list_tools" in scenarios:
+            def tools(refresh):
+                return lambda: list_tools(SERVER_NAME, return_result=True, refresh=refresh)
+
+            results["list_tools_cold"] = await measure(args.iterations, tools(True), before=close_session_pool,
+                                                       failed=is_error)
+            await measure(1, tools(True))
+            results["list_tools_warm"] = await measure(args.iterations, tools(True), failed=is_error)
+            results["list_tools_cached"] = await measure(args.iterations, tools(False), failed=is_error)
+    finally:
+        await close_session_pool()
+    return results
+
+
+def post_query(url: str) -> float:
+    """Send one query to the API server and return its latency."""
+    body = json.dumps({"server": SERVER_NAME, "query": QUERY, "model": MODEL_NAME, "cache": False})
+    request = urllib.request.Request(url, data=body.encode("utf-8"), headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=300) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run_api_throughput(args: argparse.Namespace) -> Dict[str, Any]:
+    """Measure ``POST /api/query`` throughput at each concurrency level."""
+    from werkzeug.serving import make_server
+
+    from mcp_cli.api.server import app
+    from mcp_cli.runtime import get_runtime
+
+    runtime = get_runtime()
+    runtime.run(register_model(args))
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}/api/query"
+
+    levels = {}
+    try:
+        # Warm the pool so every level measures steady-state throughput
+        with ThreadPoolExecutor(max(args.concurrency)) as executor:
+            list(executor.map(lambda _: post_query(url), range(max(args.concurrency))))
+
+        for concurrency in args.concurrency:
+            requests = max(args.requests, concurrency)
+            durations = []
+            errors = 0
+            start = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as executor:
+                futures = [executor.submit(post_query, url) for _ in range(requests)]
+                for future in futures:
+                    try:
+                        durations.append(future.result())
+                    except (urllib.error.URLError, OSError):
+                        errors += 1
+            elapsed = time.perf_counter() - start
+            summary = summarize(durations, errors)
+            summary["concurrency"] = concurrency
+            summary["throughput"] = len(durations) / elapsed if elapsed else 0.0
+            levels[str(concurrency)] = summary
+    finally:
+        server.shutdown()
+        thread.join()
+        runtime.shutdown()
+    return levels
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    scenarios = args.scenario or SCENARIOS
+    home = setup_home(args)
+    quiet_logging()
+    results: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {
+                "iterations": args.iterations,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "tools": args.tools,
+                "tool_calls": args.tool_calls,
+                "tool_latency": args.tool_latency,
+                "llm_latency": args.llm_latency,
+                "payload_size": args.payload_size
+            }
+        },
+        "scenarios": {}
+    }
+
+    local = [name for name in scenarios if name != "api_throughput"]
+    if local:
+        results["scenarios"].update(asyncio.run(run_local_scenarios(args, local)))
+    if "api_throughput" in scenarios:
+        results["scenarios"]["api_throughput"] = run_api_throughput(args)
+
+    output = args.output
+    if output is None:
+        os.makedirs(DEFAULT_RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(DEFAULT_RESULTS_DIR, f"{stamp}-{results['meta']['commit'] or 'unknown'}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print_results(results)
+    print(f"\nResults written to {output} (MCP_CLI_HOME={home})")
+    return results
+
+
+def _rows(results: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Flatten scenarios, with one row per API concurrency level."""
+    rows = {}
+    for name, summary in results.get("scenarios", {}).items():
+        if name == "api_throughput":
+            for level, level_summary in summary.items():
+                rows[f"api_throughput@{level}"] = level_summary
+        else:
+            rows[name] = summary
+    return rows
+
+
+def print_results(results: Dict[str, Any]):
+    print(f"{'scenario':<22} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'req/s':>8}")
+    for name, row in _rows(results).items():
+        throughput = f"{row['throughput']:8.1f}" if "throughput" in row else f"{'':>8}"
+        print(f"{name:<22} {row['count']:>6} {row['errors']:>6} {row['p50'] * 1000:9.1f} {row['p90'] * 1000:9.1f} "
+              f"{row['p99'] * 1000:9.1f} {row['max'] * 1000:9.1f} {throughput}")
+
+
+def compare(base_path: str, new_path: str):
+    """Print the change in latency and throughput between two result files."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def change(old, current):
+        return f"{(current - old) / old * 100:+7.1f}%" if old else f"{'n/a':>8}"
+
+    print(f"base: {base['meta'].get('commit')}  new: {new['meta'].get('commit')}")
+    print(f"{'scenario':<22} {'p50 ms':>17} {'change':>8} {'p99 ms':>17} {'change':>8} {'req/s':>15} {'change':>8}")
+    base_rows = _rows(base)
+    for name, row in _rows(new).items():
+        old = base_rows.get(name)
+        if old is None:
+            continue
+        line = (f"{name:<22} {old['p50'] * 1000:8.1f}>{row['p50'] * 1000:8.1f} {change(old['p50'], row['p50'])} "
+                f"{old['p99'] * 1000:8.1f}>{row['p99'] * 1000:8.1f} {change(old['p99'], row['p99'])}")
+        if "throughput" in row:
+            line += f" {old['throughput']:7.1f}>{row['throughput']:7.1f} {change(old['throughput'], row['throughput'])}"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="MCP CLI end-to-end benchmarks")
+    subparsers = parser.add_subparsers(dest="command", help="Command to run")
+
+    run_parser = subparsers.add_parser("run", help="Run benchmark scenarios")
+    run_parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                            help="Scenario to run; may be repeated (default: all)")
+    run_parser.add_argument("--iterations", type=int, default=10, help="Timed runs per scenario")
+    run_parser.add_argument("--requests", type=int, default=50, help="API requests per concurrency level")
+    run_parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                            default=[1, 4, 16], help="Comma-separated API concurrency levels (default: 1,4,16)")
+    run_parser.add_argument("--tools", type=int, default=4, help="Tools exposed by the stub server")
+    run_parser.add_argument("--tool-calls", type=int, default=2, help="Tool calls made per query")
+    run_parser.add_argument("--tool-latency", type=float, default=0.0, help="Seconds each tool call takes")
+    run_parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds each LLM call takes")
+    run_parser.add_argument("--payload-size", type=int, default=1024, help="Bytes returned by each tool call")
+    run_parser.add_argument("--output", help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("base", help="Result file to compare against")
+    compare_parser.add_argument("new", help="Result file to compare")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+    elif args.command == "compare":
+        compare(args.base, args.new)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
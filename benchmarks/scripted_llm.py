@@ -0,0 +1,66 @@
+"""
+A deterministic chat model for benchmarks.
+
+``ScriptedChatModel`` answers every conversation the same way: it asks for
+a fixed sequence of tool calls, one per LLM call, and then gives a fixed
+answer. Which step comes next is derived from the messages it is given,
+so concurrent queries sharing one model don't interfere.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def tool_script(calls: int, tools: int = 1) -> List[Dict[str, Any]]:
+    """Build a script of ``calls`` calls cycling over the stub server's tools."""
+    return [{"name": f"tool_{i % max(tools, 1)}", "args": {"key": f"key-{i}"}} for i in range(calls)]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that issues scripted tool calls, then a fixed answer.
+
+    Attributes:
+        script: Tool calls to make, as ``{"name": ..., "args": {...}}``
+            dictionaries, one per LLM call
+        answer: Final answer once the script is done
+        latency: Seconds each LLM call takes, to simulate a model endpoint
+    """
+
+    script: List[Dict[str, Any]] = []
+    answer: str = "Done."
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        # Tool calls come from the script, so the tool schemas are not needed
+        return self
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        step = sum(1 for message in messages if isinstance(message, AIMessage))
+        usage = {"input_tokens": len(messages), "output_tokens": 1, "total_tokens": len(messages) + 1}
+        if step < len(self.script):
+            call = self.script[step]
+            return AIMessage(content="", usage_metadata=usage, tool_calls=[{
+                "name": call["name"], "args": call.get("args", {}), "id": f"call_{step}"
+            }])
+        return AIMessage(content=self.answer, usage_metadata=usage)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
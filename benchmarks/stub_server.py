@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+A stub MCP server for benchmarks.
+
+Speaks the MCP stdio transport (newline-delimited JSON-RPC) using only the
+standard library, so it starts quickly and behaves the same on every run.
+It exposes ``--tools`` tools named ``tool_0``, ``tool_1``, ..., each taking a
+``key`` string and answering after ``--latency`` seconds with
+``--payload-size`` bytes of text derived from the key.
+
+Example configuration entry::
+
+    "stub": {
+      "command": "python",
+      "args": ["benchmarks/stub_server.py", "--latency", "0.05", "--payload-size", "4096"]
+    }
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+PROTOCOL_VERSION = "2024-11-05"
+
+# JSON-RPC error codes
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+
+def make_tools(count: int) -> List[Dict[str, Any]]:
+    """Describe ``count`` stub tools in the ``tools/list`` format."""
+    return [{
+        "name": f"tool_{i}",
+        "description": f"Stub tool {i}: returns a fixed-size payload for a key.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"key": {"type": "string", "description": "Key to look up"}},
+            "required": ["key"]
+        }
+    } for i in range(count)]
+
+
+def make_payload(tool: str, key: str, size: int) -> str:
+    """Build ``size`` bytes of text that depend only on the tool and key."""
+    seed = hashlib.sha256(f"{tool}:{key}".encode("utf-8")).hexdigest()
+    text = f"{tool}({key}): "
+    return (text + seed * (size // len(seed) + 1))[:max(size, len(text))]
+
+
+class StubServer:
+    """Answers MCP requests read from stdin on stdout.
+
+    Tool calls are answered from worker threads, so concurrent calls on
+    one session overlap like they would on a real server.
+    """
+
+    def __init__(self, tools: int = 1, latency: float = 0.0, payload_size: int = 1024,
+                 name: str = "stub"):
+        self.tools = make_tools(tools)
+        self.tool_names = {tool["name"] for tool in self.tools}
+        self.latency = latency
+        self.payload_size = payload_size
+        self.name = name
+        self._write_lock = threading.Lock()
+
+    def send(self, message: Dict[str, Any]):
+        line = json.dumps(message, separators=(",", ":"))
+        with self._write_lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def reply(self, request_id: Any, result: Optional[Dict[str, Any]] = None,
+              error: Optional[Dict[str, Any]] = None):
+        message: Dict[str, Any] = {"jsonrpc": "2.0", "id": request_id}
+        if error is not None:
+            message["error"] = error
+        else:
+            message["result"] = result if result is not None else {}
+        self.send(message)
+
+    def call_tool(self, request_id: Any, params: Dict[str, Any]):
+        name = params.get("name")
+        if name not in self.tool_names:
+            self.reply(request_id, error={"code": INVALID_PARAMS, "message": f"Unknown tool: {name}"})
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        key = str((params.get("arguments") or {}).get("key", ""))
+        self.reply(request_id, {
+            "content": [{"type": "text", "text": make_payload(name, key, self.payload_size)}],
+            "isError": False
+        })
+
+    def handle(self, message: Dict[str, Any]):
+        method = message.get("method")
+        request_id = message.get("id")
+        params = message.get("params") or {}
+        if request_id is None:
+            # Notifications, such as notifications/initialized, need no answer
+            return
+
+        if method == "initialize":
+            self.reply(request_id, {
+                "protocolVersion": params.get("protocolVersion", PROTOCOL_VERSION),
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": {"name": self.name, "version": "1.0.0"}
+            })
+        elif method == "ping":
+            self.reply(request_id, {})
+        elif method == "tools/list":
+            self.reply(request_id, {"tools": self.tools})
+        elif method == "tools/call":
+            threading.Thread(target=self.call_tool, args=(request_id, params), daemon=True).start()
+        elif method == "resources/list":
+            self.reply(request_id, {"resources": []})
+        elif method == "resources/templates/list":
+            self.reply(request_id, {"resourceTemplates": []})
+        elif method == "prompts/list":
+            self.reply(request_id, {"prompts": []})
+        else:
+            self.reply(request_id, error={"code": METHOD_NOT_FOUND, "message": f"Method not found: {method}"})
+
+    def serve(self):
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(message, dict):
+                self.handle(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub MCP server for benchmarks")
+    parser.add_argument("--tools", type=int, default=1, help="Number of tools to expose")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each tool call takes")
+    parser.add_argument("--payload-size", type=int, default=1024, help="Bytes of text each tool call returns")
+    parser.add_argument("--startup-delay", type=float, default=0.0,
+                        help="Seconds to wait before serving, to simulate a slow server start")
+    parser.add_argument("--name", default="stub", help="Server name reported to clients")
+    args = parser.parse_args()
+
+    if args.startup_delay:
+        time.sleep(args.startup_delay)
+    StubServer(args.tools, args.latency, args.payload_size, args.name).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,5 +7,17 @@ The CLI functionality is still available as a submodule.
 
 __version__ = "0.1.0"
 
-# Make the GUI functionality directly available
-from mcp_cli.gui.app import main, MCPCliGui 
\ No newline at end of file
+__all__ = ['main', 'MCPCliGui']
+
+
+def __getattr__(name):
+    """Make the GUI functionality directly available.
+    
+    The GUI is imported on first access so that importing the CLI or the
+    API server does not load PyQt5.
+    """
+    if name in __all__:
+        from mcp_cli.gui import app
+        return getattr(app, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+ 
\ No newline at end of file
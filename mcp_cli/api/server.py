@@ -7,20 +7,33 @@ the MCP CLI functionality through API endpoints.
 
 import os
 import json
+import math
 import logging
 import asyncio
 import argparse
-from typing import Dict, List, Optional, Any
+import atexit
+import itertools
+import queue
+import sys
+import time
+from typing import Dict, List, Optional, Any, Tuple
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 
 # Import MCP CLI core functions
 from mcp_cli.core import (
-    load_config, save_config, list_servers, run_query,
-    add_server, remove_server, export_config, import_config,
-    get_server_info, list_tools, DEFAULT_MODEL
+    load_config, config_transaction, list_servers, stream_query,
+    export_config, import_config, read_config_file,
+    get_server_info, get_server_tools, get_session_pool, invalidate_server_sessions,
+    execute_query as run_agent_query, ServerBusy, DEFAULT_MODEL
 )
+from mcp_cli import metrics
+from mcp_cli.batch import DEFAULT_BATCH_CONCURRENCY, run_batch
+from mcp_cli.pool import set_session_pool_overrides
+from mcp_cli.jobs import JobQueue, JobQueueFull, DEFAULT_WORKERS, DEFAULT_MAX_QUEUED, DEFAULT_MAX_RETAINED
+from mcp_cli.runtime import get_runtime
+from mcp_cli.tracing import new_trace_id, trace_id_from_traceparent
 
 # Configure logging
 logging.basicConfig(
@@ -33,31 +46,198 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Helper function to run async functions in Flask routes
+# Helper function to run async functions in Flask routes. Every request runs
+# on the shared runtime loop, so pooled and pre-warmed sessions survive
+# between requests and concurrent queries share one loop.
 def run_async(coroutine):
     """Run an async function in a Flask route."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    return get_runtime().run(coroutine)
+
+def get_server_names(data) -> Optional[List[str]]:
+    """Get the servers a query request targets, from ``servers`` or ``server``.
+    
+    ``servers`` may be a list or, as in query strings, a comma-separated
+    string. Returns None if neither field holds a usable value.
+    """
+    servers = data.get('servers')
+    if servers is None:
+        server_name = data.get('server')
+        return [server_name] if isinstance(server_name, str) and server_name else None
+    if isinstance(servers, str):
+        servers = servers.split(',')
+    if not isinstance(servers, list) or not all(isinstance(name, str) for name in servers):
+        return None
+    servers = [name.strip() for name in servers if name.strip()]
+    return servers or None
+
+def get_flag(data, name: str, default: bool) -> bool:
+    """Read a boolean request field, accepting strings such as ``false`` or ``1``."""
+    value = data.get(name, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def get_limits(data) -> Tuple[Optional[float], Optional[int]]:
+    """Read the ``timeout`` and ``max_steps`` fields of a query request.
+    
+    Raises:
+        ValueError: If a field is present but not a finite number
+    """
+    timeout = data.get('timeout')
+    max_steps = data.get('max_steps')
+    try:
+        timeout = float(timeout) if timeout not in (None, '') else None
+    except (TypeError, ValueError):
+        raise ValueError('timeout must be a number of seconds')
+    if timeout is not None and not math.isfinite(timeout):
+        raise ValueError('timeout must be a finite number of seconds')
+    try:
+        max_steps = int(max_steps) if max_steps not in (None, '') else None
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('max_steps must be an integer')
+    return timeout, max_steps
+
+def busy_response(error: ServerBusy, trace_id: Optional[str] = None):
+    """Answer ``429 Too Many Requests`` for a query that admission control rejected."""
+    body = {'error': str(error), 'retry_after': error.retry_after}
+    if trace_id:
+        body['trace_id'] = trace_id
+    return jsonify(body), 429, {'Retry-After': str(error.retry_after)}
+
+def iterate_async(async_iterable):
+    """Iterate over an async iterable from a Flask route.
+    
+    The iterable is consumed on the runtime loop and its items are handed to
+    the calling thread through a queue. Stopping early, for example when
+    the client disconnects, cancels the iteration.
+    """
+    items = queue.Queue()
+    done = object()
+    
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put(item)
+        finally:
+            items.put(done)
+    
+    future = get_runtime().submit(pump())
     try:
-        return loop.run_until_complete(coroutine)
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            yield item
     finally:
-        loop.close()
+        future.cancel()
+
+# Upper bound on the concurrency a batch request may ask for
+MAX_BATCH_CONCURRENCY = 32
+
+# Queue for asynchronous query jobs; reconfigured from the command line in main()
+job_queue = JobQueue()
+
+def shutdown():
+    """Cancel outstanding jobs, then close sessions and stop the runtime."""
+    runtime = get_runtime()
+    if runtime.running:
+        try:
+            runtime.run(job_queue.close(), timeout=10)
+        except Exception as e:
+            logger.warning(f"Error stopping job workers: {e}")
+    runtime.shutdown()
+
+atexit.register(shutdown)
+
+# Pre-warm state, reported by the status endpoint
+warmup_state = {
+    'status': 'ok',
+    'servers': {}
+}
+
+async def prewarm_servers(server_names: Optional[List[str]] = None):
+    """Start sessions for the configured servers concurrently.
+    
+    Args:
+        server_names: Servers to warm up, or None for every configured server
+    """
+    servers = load_config(readonly=True).get("mcpServers", {})
+    if server_names is None:
+        server_names = list(servers.keys())
+    
+    for name in server_names:
+        if name not in servers:
+            warmup_state['servers'][name] = {'status': 'error', 'error': f"Server '{name}' not found"}
+    selected = {name: servers[name] for name in server_names if name in servers}
+    
+    warmup_state['status'] = 'warming'
+    for name in selected:
+        warmup_state['servers'][name] = {'status': 'warming'}
+    
+    pool = get_session_pool(load_config(readonly=True).get("sessionPool", {}))
+    
+    async def warm(name):
+        start = time.monotonic()
+        error = (await pool.prewarm({name: selected[name]}))[name]
+        elapsed = round(time.monotonic() - start, 3)
+        if error is None:
+            warmup_state['servers'][name] = {'status': 'ready', 'seconds': elapsed}
+            logger.info(f"Server '{name}' ready in {elapsed}s")
+        else:
+            warmup_state['servers'][name] = {'status': 'error', 'error': str(error), 'seconds': elapsed}
+            logger.error(f"Failed to pre-warm server '{name}': {error}")
+    
+    await asyncio.gather(*(warm(name) for name in selected))
+    warmup_state['status'] = 'ok'
+    logger.info("Pre-warming finished")
+
+def start_prewarm(server_names: Optional[List[str]] = None):
+    """Begin pre-warming servers on the background event loop.
+    
+    Returns immediately; ``/api/status`` reports "warming" until it finishes.
+    """
+    warmup_state['status'] = 'warming'
+    return get_runtime().submit(prewarm_servers(server_names))
 
 # Status endpoint
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Health check endpoint."""
-    return jsonify({
-        'status': 'ok',
+    response = {
+        'status': warmup_state['status'],
         'service': 'mcp-cli-api',
         'version': '0.1.0'
-    })
+    }
+    if warmup_state['servers']:
+        response['servers'] = warmup_state['servers']
+    
+    # Report unavailable while warming up so load balancers hold traffic back
+    if warmup_state['status'] != 'ok':
+        return jsonify(response), 503
+    return jsonify(response)
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Expose query, session and job metrics in the Prometheus text format."""
+    # Read on the runtime loop, which is the only thread changing the pool and the jobs
+    async def pool_stats():
+        return get_session_pool().stats()
+    
+    async def job_stats():
+        return job_queue.stats()
+    
+    metrics.update_pool_gauges(run_async(pool_stats()))
+    metrics.JOBS.clear()
+    for status, count in run_async(job_stats()).items():
+        metrics.JOBS.set(count, status=status)
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # Servers endpoints
 @app.route('/api/servers', methods=['GET'])
 def get_servers():
     """List all configured MCP servers."""
-    config = load_config()
+    config = load_config(readonly=True)
     servers = config.get("mcpServers", {})
     return jsonify({
         'servers': [
@@ -74,7 +254,7 @@ def get_servers():
 @app.route('/api/servers/<name>', methods=['GET'])
 def get_server(name):
     """Get information about a specific MCP server."""
-    config = load_config()
+    config = load_config(readonly=True)
     servers = config.get("mcpServers", {})
     
     if name not in servers:
@@ -93,27 +273,44 @@ def get_server(name):
 
 @app.route('/api/servers', methods=['POST'])
 def create_server():
-    """Add a new MCP server."""
+    """Add a new MCP server, or several at once.
+    
+    A body with a ``servers`` list registers every entry in a single
+    configuration write.
+    """
     data = request.json
     
     if not data:
         return jsonify({'error': 'No data provided'}), 400
     
-    name = data.get('name')
-    command = data.get('command')
-    args = data.get('args', [])
-    env = data.get('env')
+    entries = data.get('servers') if isinstance(data.get('servers'), list) else [data]
     
-    if not name:
-        return jsonify({'error': 'Server name is required'}), 400
-    if not command:
-        return jsonify({'error': 'Command is required'}), 400
+    new_servers = {}
+    for entry in entries:
+        name = entry.get('name')
+        command = entry.get('command')
+        
+        if not name:
+            return jsonify({'error': 'Server name is required'}), 400
+        if not command:
+            return jsonify({'error': 'Command is required'}), 400
+        
+        server_config = {
+            'command': command,
+            'args': entry.get('args', [])
+        }
+        if entry.get('env'):
+            server_config['env'] = entry['env']
+        new_servers[name] = server_config
     
     try:
-        add_server(name, command, args, env)
+        with config_transaction() as config:
+            config.setdefault("mcpServers", {}).update(new_servers)
+        
+        names = ", ".join(f"'{name}'" for name in new_servers)
         return jsonify({
             'status': 'success',
-            'message': f"Server '{name}' added successfully"
+            'message': f"Server{'s' if len(new_servers) > 1 else ''} {names} added successfully"
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -134,26 +331,27 @@ def update_server(name):
         return jsonify({'error': 'At least one of command, args, or env must be provided'}), 400
     
     try:
-        # Load current configuration
-        config = load_config()
-        servers = config.get("mcpServers", {})
+        # Load, modify and save under the config lock so concurrent
+        # writers can't lose each other's updates
+        with config_transaction() as config:
+            servers = config.get("mcpServers", {})
+            
+            if name not in servers:
+                return jsonify({
+                    'error': f"Server '{name}' not found",
+                    'available_servers': list(servers.keys())
+                }), 404
+            
+            # Update server configuration
+            if command:
+                servers[name]['command'] = command
+            if args:
+                servers[name]['args'] = args
+            if env:
+                servers[name]['env'] = env
         
-        if name not in servers:
-            return jsonify({
-                'error': f"Server '{name}' not found",
-                'available_servers': list(servers.keys())
-            }), 404
-        
-        # Update server configuration
-        if command:
-            servers[name]['command'] = command
-        if args:
-            servers[name]['args'] = args
-        if env:
-            servers[name]['env'] = env
-        
-        # Save updated configuration
-        save_config(config)
+        # Sessions started from the old configuration are not reused
+        run_async(invalidate_server_sessions(name))
         
         return jsonify({
             'status': 'success',
@@ -165,17 +363,20 @@ def update_server(name):
 @app.route('/api/servers/<name>', methods=['DELETE'])
 def delete_server(name):
     """Remove an MCP server."""
-    config = load_config()
-    servers = config.get("mcpServers", {})
-    
-    if name not in servers:
-        return jsonify({
-            'error': f"Server '{name}' not found",
-            'available_servers': list(servers.keys())
-        }), 404
-    
     try:
-        remove_server(name)
+        with config_transaction() as config:
+            servers = config.get("mcpServers", {})
+            
+            if name not in servers:
+                return jsonify({
+                    'error': f"Server '{name}' not found",
+                    'available_servers': list(servers.keys())
+                }), 404
+            
+            del servers[name]
+        
+        run_async(invalidate_server_sessions(name))
+        
         return jsonify({
             'status': 'success',
             'message': f"Server '{name}' removed successfully"
@@ -192,31 +393,226 @@ def execute_query():
     if not data:
         return jsonify({'error': 'No data provided'}), 400
     
-    server_name = data.get('server')
+    server_names = get_server_names(data)
     query = data.get('query')
     model = data.get('model', DEFAULT_MODEL)
     
-    if not server_name:
+    if not server_names:
         return jsonify({'error': 'Server name is required'}), 400
     if not query:
         return jsonify({'error': 'Query is required'}), 400
+    try:
+        timeout, max_steps = get_limits(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    servers = load_config(readonly=True).get("mcpServers", {})
+    for server_name in server_names:
+        if server_name not in servers:
+            return jsonify({
+                'error': f"Server '{server_name}' not found",
+                'available_servers': list(servers.keys())
+            }), 404
+    
+    # Continue the caller's trace if it sent one, so the query's spans join it
+    trace_id = trace_id_from_traceparent(request.headers.get('traceparent')) or new_trace_id()
+    
+    # Note whether the answer came from the query result cache or is partial, and its timings
+    result_events = []
+    def on_event(event):
+        if event.type == 'result':
+            result_events.append(event)
     
     try:
-        result = run_async(run_query(server_name, query, model, True))
+        result = run_async(run_agent_query(
+            server_names, query, model, emit=on_event, trace_id=trace_id,
+            use_cache=get_flag(data, 'cache', True), refresh_cache=get_flag(data, 'refresh', False),
+            timeout=timeout, max_steps=max_steps
+        ))
         return jsonify({
             'status': 'success',
-            'result': result
+            'result': result,
+            'cached': any(event.data.get('cached') for event in result_events),
+            'timed_out': any(event.data.get('timed_out') for event in result_events),
+            'max_steps_reached': any(event.data.get('max_steps_reached') for event in result_events),
+            'timings': result_events[-1].data.get('timings') if result_events else None,
+            'trace_id': trace_id
         })
+    except ServerBusy as e:
+        return busy_response(e, trace_id)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'trace_id': trace_id}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return jsonify({'error': str(e), 'trace_id': trace_id}), 500
+
+@app.route('/api/query/stream', methods=['GET', 'POST'])
+def execute_query_stream():
+    """Run a query and stream its progress as Server-Sent Events.
+    
+    Parameters are read from the JSON body for POST and from the query
+    string for GET, so the endpoint also works with ``EventSource``.
+    
+    The response starts once the query has its first event, so a query
+    turned away by admission control gets a ``429`` instead of a stream.
+    """
+    data = request.json if request.method == 'POST' else request.args
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    server_names = get_server_names(data)
+    query = data.get('query')
+    model = data.get('model', DEFAULT_MODEL)
+    
+    if not server_names:
+        return jsonify({'error': 'Server name is required'}), 400
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    try:
+        timeout, max_steps = get_limits(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    use_cache = get_flag(data, 'cache', True)
+    refresh_cache = get_flag(data, 'refresh', False)
+    trace_id = trace_id_from_traceparent(request.headers.get('traceparent'))
+    
+    events = iterate_async(stream_query(server_names, query, model, use_cache=use_cache, refresh_cache=refresh_cache,
+                                        trace_id=trace_id, timeout=timeout, max_steps=max_steps))
+    first = next(events, None)
+    if first is not None and first.type == 'error' and 'retry_after' in first.data:
+        events.close()
+        return busy_response(ServerBusy(first.data['server'], first.data['retry_after']), trace_id)
+    
+    def generate():
+        # Closing the response cancels the query if the client disconnects
+        try:
+            for event in itertools.chain([first] if first is not None else [], events):
+                yield f"event: {event.type}\ndata: {json.dumps(event.to_dict(), default=str)}\n\n"
+        finally:
+            events.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/query/batch', methods=['POST'])
+def execute_query_batch():
+    """Run many queries and stream their results as newline-delimited JSON.
+    
+    Results are written as each query finishes, not in request order;
+    the ``index`` field of a result refers to its position in ``items``.
+    """
+    data = request.json
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    items = data.get('items')
+    model = data.get('model', DEFAULT_MODEL)
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'A non-empty list of items is required'}), 400
+    if not all(isinstance(item, dict) for item in items):
+        return jsonify({'error': 'Each item must be an object with server and query'}), 400
+    
+    try:
+        concurrency = int(data.get('concurrency', DEFAULT_BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'concurrency must be an integer'}), 400
+    concurrency = max(1, min(concurrency, MAX_BATCH_CONCURRENCY))
+    try:
+        timeout, max_steps = get_limits(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    use_cache = get_flag(data, 'cache', True)
+    refresh_cache = get_flag(data, 'refresh', False)
+    
+    def generate():
+        for result in iterate_async(run_batch(items, concurrency, model, use_cache, refresh_cache,
+                                              timeout, max_steps)):
+            yield json.dumps(result, default=str) + "\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Job endpoints
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue a query for asynchronous execution."""
+    data = request.json
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    server_names = get_server_names(data)
+    query = data.get('query')
+    model = data.get('model', DEFAULT_MODEL)
+    
+    if not server_names:
+        return jsonify({'error': 'Server name is required'}), 400
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    try:
+        timeout, max_steps = get_limits(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    servers = load_config(readonly=True).get("mcpServers", {})
+    for server_name in server_names:
+        if server_name not in servers:
+            return jsonify({
+                'error': f"Server '{server_name}' not found",
+                'available_servers': list(servers.keys())
+            }), 404
+    
+    target = server_names[0] if len(server_names) == 1 else server_names
+    try:
+        job = run_async(job_queue.submit(target, query, model, timeout, max_steps))
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    }), 202, {'Location': f"/api/jobs/{job.id}"}
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status and result of a job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f"Job '{job_id}' not found"}), 404
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job."""
+    job = run_async(job_queue.cancel(job_id))
+    if job is None:
+        return jsonify({'error': f"Job '{job_id}' not found"}), 404
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    })
 
 # Tools endpoints
 @app.route('/api/servers/<name>/tools', methods=['GET'])
 def get_tools(name):
     """List tools provided by an MCP server."""
-    model = request.args.get('model', DEFAULT_MODEL)
+    refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
     
-    config = load_config()
+    config = load_config(readonly=True)
     servers = config.get("mcpServers", {})
     
     if name not in servers:
@@ -226,56 +622,17 @@ def get_tools(name):
         }), 404
     
     try:
-        # Call the tools listing function
-        result = run_async(list_tools(name, model, True))
-        logger.info(f"Tools result from server '{name}': {result}")
-        
-        # Parse the text result into a structured format
-        # This is a simple parsing, you may need to improve it
-        tools = []
-        current_tool = None
-        
-        for line in result.split('\n'):
-            if line.startswith('• '):
-                if current_tool:
-                    tools.append(current_tool)
-                
-                current_tool = {
-                    'name': line[2:].strip(),
-                    'description': '',
-                    'parameters': {}
-                }
-            elif current_tool and line.strip().startswith('Description:'):
-                current_tool['description'] = line.replace('Description:', '').strip()
-            elif current_tool and line.strip().startswith('Parameters:'):
-                # Try to parse parameters as JSON
-                try:
-                    params_text = line.replace('Parameters:', '').strip()
-                    # Combine with next lines if it's only the start of JSON
-                    if params_text.startswith('{') and not params_text.endswith('}'):
-                        params_lines = []
-                        for i, next_line in enumerate(result.split('\n')[result.split('\n').index(line) + 1:]):
-                            params_lines.append(next_line.strip())
-                            combined = params_text + ' ' + ' '.join(params_lines)
-                            try:
-                                json.loads(combined)
-                                params_text = combined
-                                break
-                            except:
-                                continue
-                    
-                    current_tool['parameters'] = json.loads(params_text)
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to parse parameters: {params_text}")
-                    current_tool['parameters'] = {"error": "Failed to parse parameters"}
-        
-        # Add the last tool if there is one
-        if current_tool:
-            tools.append(current_tool)
-        
+        tools = run_async(get_server_tools(name, servers[name], refresh))
         return jsonify({
             'status': 'success',
-            'tools': tools
+            'tools': [
+                {
+                    'name': tool.name,
+                    'description': tool.description,
+                    'parameters': tool.input_schema
+                }
+                for tool in tools
+            ]
         })
     except Exception as e:
         logger.error(f"Error getting tools: {str(e)}")
@@ -320,6 +677,11 @@ def import_configuration():
     if not os.path.exists(filepath):
         return jsonify({'error': f"File '{filepath}' not found"}), 404
     
+    try:
+        read_config_file(filepath)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         import_config(filepath)
         return jsonify({
@@ -335,11 +697,48 @@ def parse_args():
     parser.add_argument("--host", default="0.0.0.0", help="Host to run the server on")
     parser.add_argument("--port", type=int, default=5000, help="Port to run the server on")
     parser.add_argument("--debug", action="store_true", help="Run in debug mode")
+    parser.add_argument("--job-workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Number of jobs run concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--job-queue-size", type=int, default=DEFAULT_MAX_QUEUED,
+                        help=f"Maximum number of waiting jobs (default: {DEFAULT_MAX_QUEUED})")
+    parser.add_argument("--job-retention", type=int, default=DEFAULT_MAX_RETAINED,
+                        help=f"Number of finished jobs kept in memory (default: {DEFAULT_MAX_RETAINED})")
+    parser.add_argument("--job-store", default=None, metavar="DIR",
+                        help="Directory where finished jobs are also stored on disk")
+    parser.add_argument("--prewarm", nargs="?", const="", default=None, metavar="SERVERS",
+                        help="Start MCP servers at startup (all, or a comma-separated list)")
+    parser.add_argument("--max-sessions", type=int, default=None, metavar="N",
+                        help="Sessions started per server without maxConcurrency (default: the sessionPool setting, or 4)")
+    parser.add_argument("--idle-timeout", type=float, default=None, metavar="SECONDS",
+                        help="Seconds an idle server session is kept (default: the sessionPool setting, or 300)")
     return parser.parse_args()
 
 def main():
     """Main entry point for the API server."""
     args = parse_args()
+    
+    overrides = {}
+    if args.max_sessions is not None:
+        overrides['maxSessionsPerServer'] = args.max_sessions
+    if args.idle_timeout is not None:
+        overrides['idleTimeout'] = args.idle_timeout
+    try:
+        set_session_pool_overrides(overrides)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    
+    global job_queue
+    job_queue = JobQueue(
+        workers=args.job_workers,
+        max_queued=args.job_queue_size,
+        max_retained=args.job_retention,
+        store_dir=args.job_store
+    )
+    
+    if args.prewarm is not None:
+        server_names = [name.strip() for name in args.prewarm.split(",") if name.strip()] or None
+        logger.info(f"Pre-warming servers: {', '.join(server_names) if server_names else 'all'}")
+        start_prewarm(server_names)
     logger.info(f"Starting MCP CLI API server on {args.host}:{args.port}")
     app.run(host=args.host, port=args.port, debug=args.debug)
 
@@ -0,0 +1,126 @@
+"""
+Batch query execution for MCP CLI.
+
+Running many queries one ``mcp run`` at a time pays for a Python start-up
+and a server spawn per query. ``run_batch`` runs a list of queries with
+bounded concurrency over the pooled sessions of one process, and reports
+each result as soon as it finishes.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from mcp_cli.core import DEFAULT_MODEL, execute_query
+
+DEFAULT_BATCH_CONCURRENCY = 4
+
+
+def read_batch(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """Parse batch items from JSON Lines, such as an open file.
+
+    Each non-empty line is an object with ``server`` (or a ``servers``
+    list) and ``query``, and optionally ``model``, ``id``, ``timeout`` and
+    ``max_steps``.
+
+    Raises:
+        ValueError: If a line is not a JSON object
+    """
+    items = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number}: invalid JSON: {e}")
+        if not isinstance(item, dict):
+            raise ValueError(f"Line {number}: expected a JSON object")
+        items.append(item)
+    return items
+
+
+async def _run_item(index: int, item: Dict[str, Any], model: str, use_cache: bool,
+                    refresh_cache: bool, timeout: Optional[float], max_steps: Optional[int]) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        "index": index,
+        "server": item.get("server"),
+        "query": item.get("query"),
+        "model": item.get("model") or model
+    }
+    for key in ("servers", "id"):
+        if key in item:
+            result[key] = item[key]
+    servers = item.get("servers") or result["server"]
+
+    def on_event(event):
+        if event.type == "result":
+            result["cached"] = event.data.get("cached", False)
+            result["timed_out"] = event.data.get("timed_out", False)
+            result["max_steps_reached"] = event.data.get("max_steps_reached", False)
+            result["timings"] = event.data.get("timings")
+
+    start = time.monotonic()
+    result["started_at"] = time.time()
+    try:
+        if not servers or not result["query"]:
+            raise ValueError("Both 'server' (or 'servers') and 'query' are required")
+        # The batch is already bounded, so wait for busy servers rather
+        # than failing the item
+        result["result"] = await execute_query(servers, result["query"], result["model"], emit=on_event,
+                                               block=True, use_cache=use_cache, refresh_cache=refresh_cache,
+                                               timeout=item.get("timeout", timeout),
+                                               max_steps=item.get("max_steps", max_steps))
+        result["status"] = "success"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["duration"] = time.monotonic() - start
+    return result
+
+
+async def run_batch(items: Iterable[Dict[str, Any]], concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+                    model: str = DEFAULT_MODEL, use_cache: bool = True, refresh_cache: bool = False,
+                    timeout: Optional[float] = None, max_steps: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Run queries concurrently and yield each result as it finishes.
+
+    Results arrive in completion order; ``index`` gives the position of the
+    item in the batch. A failing item yields a result with ``status`` set
+    to ``"error"`` and does not stop the batch. Closing the generator early
+    cancels the queries still running.
+
+    Args:
+        items: Dictionaries with ``server`` or ``servers``, ``query`` and
+            optionally ``model``, ``id``, ``timeout`` and ``max_steps``
+        concurrency: Maximum number of queries running at once
+        model: OpenAI model for items that don't name one
+        use_cache: If False, neither read nor store results in the query cache
+        refresh_cache: If True, run every query even on a cache hit
+        timeout: Seconds each query may take, for items that don't set one
+        max_steps: Maximum agent steps, for items that don't set one
+    """
+    pending = iter(enumerate(items))
+    results: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+
+    async def worker():
+        try:
+            for index, item in pending:
+                results.put_nowait(await _run_item(index, item, model, use_cache, refresh_cache, timeout, max_steps))
+        finally:
+            results.put_nowait(None)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+    try:
+        remaining = len(workers)
+        while remaining:
+            result = await results.get()
+            if result is None:
+                remaining -= 1
+            else:
+                yield result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
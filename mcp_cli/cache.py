@@ -0,0 +1,352 @@
+"""
+Caches for MCP CLI.
+
+Discovering a server's tools means starting the server and running the MCP
+handshake, which takes seconds. ``ToolSchemaCache`` keeps each server's tool
+list on disk, keyed by a fingerprint of its configuration, so tool browsing
+can be answered immediately and refreshed in the background.
+
+``QueryResultCache`` keeps the answers of whole agent runs, so a question
+asked again of the same servers with the same model skips the agent.
+``ToolCallCache`` memoizes individual calls to tools a server declares as
+read-only, within a run and across runs.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from mcp_cli.events import ToolCallMiddleware
+from mcp_cli.pool import server_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOOL_CACHE_TTL = 3600.0
+DEFAULT_QUERY_CACHE_TTL = 3600.0
+DEFAULT_QUERY_CACHE_ENTRIES = 1000
+DEFAULT_TOOL_CALL_TTL = 300.0
+DEFAULT_TOOL_CALL_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class ToolSchemaCache:
+    """Persistent cache of server tool lists with stale-while-revalidate reads.
+
+    Each server configuration is stored in its own JSON file named after its
+    fingerprint, so editing a server's command, arguments or environment
+    naturally misses the old entry.
+    """
+
+    def __init__(self, cache_dir: str, ttl: float = DEFAULT_TOOL_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._refreshing: Dict[Tuple[str, str], "asyncio.Task"] = {}
+        self._tasks: Set["asyncio.Task"] = set()
+
+    def _path(self, server_name: str, server_config: Dict[str, Any]) -> str:
+        return os.path.join(self.cache_dir, f"{server_fingerprint(server_config)}.json")
+
+    def get(self, server_name: str, server_config: Dict[str, Any]) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """Look up the cached tools for a server.
+
+        Returns:
+            A ``(tools, fresh)`` tuple, where ``fresh`` is False once the entry
+            is older than the TTL, or None if nothing usable is cached.
+        """
+        path = self._path(server_name, server_config)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            tools = entry["tools"]
+            fetched_at = float(entry["fetched_at"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable tool cache entry {path}: {e}")
+            return None
+
+        fresh = time.time() - fetched_at < self.ttl
+        return tools, fresh
+
+    def put(self, server_name: str, server_config: Dict[str, Any], tools: List[Dict[str, Any]]):
+        """Store the tools for a server, replacing the file atomically."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "server": server_name,
+            "fingerprint": server_fingerprint(server_config),
+            "fetched_at": time.time(),
+            "tools": tools
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(server_name, server_config))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def invalidate(self, server_name: str, server_config: Dict[str, Any]):
+        """Drop the cached tools for a server."""
+        try:
+            os.unlink(self._path(server_name, server_config))
+        except FileNotFoundError:
+            pass
+
+    def refresh_in_background(self, server_name: str, server_config: Dict[str, Any],
+                              fetch: Callable[[], Awaitable[List[Dict[str, Any]]]]):
+        """Schedule ``fetch`` on the running loop and store its result.
+
+        Only one refresh per server configuration runs at a time; further
+        calls while it is in flight are ignored.
+        """
+        key = (server_name, server_fingerprint(server_config))
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self.put(server_name, server_config, await fetch())
+                logger.info(f"Refreshed cached tools for '{server_name}'")
+            except Exception as e:
+                logger.warning(f"Failed to refresh cached tools for '{server_name}': {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refreshing[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def wait_for_refreshes(self):
+        """Wait for background refreshes started on the running loop to finish."""
+        loop = asyncio.get_running_loop()
+        pending = [task for task in self._tasks if task.get_loop() is loop]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups by collapsing whitespace."""
+    return " ".join(query.split())
+
+
+def query_cache_key(servers: Dict[str, Dict[str, Any]], model: str, query: str) -> str:
+    """Return the cache key for a query against a set of servers with a model."""
+    payload = json.dumps([
+        sorted((name, server_fingerprint(config)) for name, config in servers.items()),
+        model,
+        normalize_query(query)
+    ], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QueryResultCache:
+    """LRU cache of query results with a TTL, optionally backed by SQLite.
+
+    Entries are held in memory up to ``max_entries``, least recently used
+    first out. If ``db_path`` is set, results are also stored in a SQLite
+    database there, which lets the CLI, API server and GUI share results
+    across processes. Database errors are logged and treated as misses, so
+    the cache never fails a query.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_QUERY_CACHE_TTL, max_entries: int = DEFAULT_QUERY_CACHE_ENTRIES,
+                 db_path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._last_prune = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, result TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a result, or return None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, stored_at = entry
+                if now - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    return result
+                del self._entries[key]
+
+            if not self.db_path:
+                return None
+            try:
+                row = self._connect().execute(
+                    "SELECT result, stored_at FROM results WHERE key = ? AND stored_at > ?",
+                    (key, now - self.ttl)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Query cache lookup failed: {e}")
+                return None
+            if row is None:
+                return None
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key: str, result: str):
+        """Store a result."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, result, now)
+            if not self.db_path:
+                return
+            try:
+                db = self._connect()
+                db.execute("INSERT OR REPLACE INTO results (key, result, stored_at) VALUES (?, ?, ?)",
+                           (key, result, now))
+                # Drop expired rows at most once a minute
+                if now - self._last_prune >= 60:
+                    self._last_prune = now
+                    db.execute("DELETE FROM results WHERE stored_at <= ?", (now - self.ttl,))
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to store query result: {e}")
+
+    def _remember(self, key: str, result: str, stored_at: float):
+        self._entries[key] = (result, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+            if self.db_path:
+                try:
+                    db = self._connect()
+                    db.execute("DELETE FROM results")
+                    db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to clear query cache: {e}")
+
+    def close(self):
+        """Close the database connection, if any."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def _result_size(result: Any) -> int:
+    """Estimate the memory held by a tool result from its serialized size."""
+    if hasattr(result, "model_dump_json"):
+        try:
+            return len(result.model_dump_json())
+        except Exception:
+            pass
+    return len(json.dumps(result, default=str))
+
+
+class ToolCallCache:
+    """In-memory cache of tool call results, bounded by their total size.
+
+    Only tools listed in a server's ``cacheableTools`` are cached, for
+    ``toolCacheTtl`` seconds (default: 300). Because a tool that is not
+    listed may change what the cached ones would return, calling it drops
+    every cached result for that server. Results flagged as errors are
+    never cached.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_TOOL_CALL_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str, str, str], Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(server_name: str, server_config: Dict[str, Any], tool_name: str,
+            arguments: Dict[str, Any]) -> Tuple[str, str, str, str]:
+        """Return the cache key for a call to a tool with some arguments."""
+        payload = json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+        arguments_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return server_name, server_fingerprint(server_config), tool_name, arguments_hash
+
+    def get(self, key: Tuple[str, str, str, str]) -> Optional[Any]:
+        """Look up a result, or return None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple[str, str, str, str], result: Any, ttl: float = DEFAULT_TOOL_CALL_TTL):
+        """Store a result, evicting the least recently used ones beyond ``max_bytes``."""
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (result, size, time.monotonic() + ttl)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Tuple[str, str, str, str]):
+        _, size, _ = self._entries.pop(key)
+        self.size -= size
+
+    def invalidate(self, server_name: Optional[str] = None, tool_name: Optional[str] = None):
+        """Drop cached results, for one server and/or tool or all of them."""
+        with self._lock:
+            for key in list(self._entries):
+                if (server_name is None or key[0] == server_name) and (tool_name is None or key[2] == tool_name):
+                    self._drop(key)
+
+    def middleware(self, servers: Dict[str, Dict[str, Any]]) -> ToolCallMiddleware:
+        """Create a tool call middleware that serves cacheable tools from this cache.
+
+        Args:
+            servers: Configuration of each server by name
+        """
+        async def middleware(server_name, name, arguments, call_next):
+            server_config = servers.get(server_name) or {}
+            cacheable = server_config.get("cacheableTools") or []
+            if name not in cacheable:
+                result = await call_next(name, arguments)
+                if cacheable:
+                    self.invalidate(server_name)
+                return result
+
+            key = self.key(server_name, server_config, name, arguments)
+            result = self.get(key)
+            if result is None:
+                result = await call_next(name, arguments)
+                if not getattr(result, "isError", False):
+                    self.put(key, result, server_config.get("toolCacheTtl", DEFAULT_TOOL_CALL_TTL))
+            return result
+        return middleware
@@ -4,11 +4,28 @@ Command line interface functionality for MCP CLI.
 
 import argparse
 import asyncio
+import json
+import sys
+import time
 from typing import Dict, List, Optional
 
+from mcp_cli.batch import DEFAULT_BATCH_CONCURRENCY, read_batch, run_batch
+from mcp_cli.loadgen import (
+    ARRIVAL_MODELS,
+    DEFAULT_BENCH_CONCURRENCY,
+    DEFAULT_BENCH_DURATION,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_URL,
+    SCENARIOS,
+    format_report,
+    parse_duration,
+    run_load,
+)
 from mcp_cli.core import (
     DEFAULT_MODEL,
     add_server,
+    close_llm_registry,
+    close_session_pool,
     export_config,
     get_server_info,
     import_config,
@@ -16,6 +33,7 @@ from mcp_cli.core import (
     list_tools,
     remove_server,
     run_query,
+    shutdown_tracing,
 )
 
 def create_parser():
@@ -28,9 +46,46 @@ def create_parser():
     
     # Run query command
     run_parser = subparsers.add_parser("run", help="Run a query against an MCP server")
-    run_parser.add_argument("server", help="Server name to use")
+    run_parser.add_argument("server", nargs="?", help="Server name to use")
     run_parser.add_argument("query", help="Query to run")
-    run_parser.add_argument("--model", default=DEFAULT_MODEL, help=f"OpenAI model to use (default: {DEFAULT_MODEL})")
+    run_parser.add_argument("--servers", help="Comma-separated server names to use together in one agent, instead of a single server")
+    run_parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Model to use, optionally prefixed with openai:, local: or replay: (default: {DEFAULT_MODEL})")
+    run_parser.add_argument("--no-cache", action="store_true", help="Don't use the query result cache")
+    run_parser.add_argument("--refresh-cache", action="store_true", help="Run the query even if a cached result exists, and cache the new result")
+    run_parser.add_argument("--timeout", type=float, help="Seconds the query may take; past it, the agent is stopped and its partial result shown (default: the server's queryTimeout, or none)")
+    run_parser.add_argument("--max-steps", type=int, help="Maximum number of agent steps (default: the server's maxSteps, or 30)")
+    
+    # Run batch command
+    batch_parser = subparsers.add_parser("run-batch", help="Run queries from a JSON Lines file")
+    batch_parser.add_argument("file", help="JSON Lines file with one {\"server\", \"query\", \"model\"} object per line, or - for stdin")
+    batch_parser.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY,
+                              help=f"Number of queries to run at once (default: {DEFAULT_BATCH_CONCURRENCY})")
+    batch_parser.add_argument("--model", default=DEFAULT_MODEL, help=f"OpenAI model for lines that don't set one (default: {DEFAULT_MODEL})")
+    batch_parser.add_argument("--output", help="Write results to this file instead of stdout")
+    batch_parser.add_argument("--no-cache", action="store_true", help="Don't use the query result cache")
+    batch_parser.add_argument("--refresh-cache", action="store_true", help="Run every query even if a cached result exists")
+    batch_parser.add_argument("--timeout", type=float, help="Seconds each query may take, for lines that don't set one")
+    batch_parser.add_argument("--max-steps", type=int, help="Maximum agent steps per query, for lines that don't set one")
+    
+    # Load test command
+    bench_parser = subparsers.add_parser("bench", help="Generate load against a running API server")
+    bench_parser.add_argument("--url", default=DEFAULT_URL, help=f"Base URL of the API server (default: {DEFAULT_URL})")
+    bench_parser.add_argument("--scenario", choices=SCENARIOS, default="query",
+                              help="Requests to send: query runs queries, tools lists a server's tools, servers lists servers (default: query)")
+    bench_parser.add_argument("--concurrency", type=int, default=DEFAULT_BENCH_CONCURRENCY,
+                              help=f"Clients in a closed loop, or maximum requests in flight in an open loop (default: {DEFAULT_BENCH_CONCURRENCY})")
+    bench_parser.add_argument("--duration", default=DEFAULT_BENCH_DURATION,
+                              help=f"How long to send requests, e.g. 30s, 5m (default: {DEFAULT_BENCH_DURATION})")
+    bench_parser.add_argument("--arrival", choices=ARRIVAL_MODELS, default="closed",
+                              help="closed: each client waits for its response; open: requests arrive at --rate regardless (default: closed)")
+    bench_parser.add_argument("--rate", type=float, help="Average requests per second for an open loop")
+    bench_parser.add_argument("--server", help="Server to query or list the tools of")
+    bench_parser.add_argument("--query", help="Query to run in the query scenario")
+    bench_parser.add_argument("--model", help="OpenAI model for the query scenario (default: the API server's default)")
+    bench_parser.add_argument("--no-cache", action="store_true", help="Bypass the query result cache or the tool cache")
+    bench_parser.add_argument("--timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT,
+                              help=f"Seconds before a request counts as timed out (default: {DEFAULT_REQUEST_TIMEOUT:g})")
+    bench_parser.add_argument("--output", help="Also write the report as JSON to this file")
     
     # Add server command
     add_parser = subparsers.add_parser("add", help="Add a new MCP server")
@@ -58,16 +113,90 @@ def create_parser():
     # List tools command
     tools_parser = subparsers.add_parser("tools", help="List tools available from a server")
     tools_parser.add_argument("server", help="Server name")
-    tools_parser.add_argument("--model", default=DEFAULT_MODEL, help=f"OpenAI model to use (default: {DEFAULT_MODEL})")
+    tools_parser.add_argument("--refresh", action="store_true", help="Ignore cached tools and query the server")
     
     return parser
 
 async def main_async(args):
     """Asynchronous main function."""
+    try:
+        await dispatch(args)
+    finally:
+        # Shut down any MCP servers started by the session pool
+        await close_session_pool()
+        await close_llm_registry()
+        # Export any spans still queued before the process exits
+        shutdown_tracing()
+
+async def run_batch_file(filepath: str, concurrency: int, model: str, output: Optional[str] = None,
+                         use_cache: bool = True, refresh_cache: bool = False, timeout: Optional[float] = None,
+                         max_steps: Optional[int] = None):
+    """Run the queries in a JSON Lines file, writing one JSON result per line."""
+    try:
+        if filepath == "-":
+            items = read_batch(sys.stdin)
+        else:
+            with open(filepath, "r") as f:
+                items = read_batch(f)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    
+    out = open(output, "w") if output else sys.stdout
+    start = time.monotonic()
+    failed = 0
+    try:
+        async for result in run_batch(items, concurrency, model, use_cache, refresh_cache, timeout, max_steps):
+            if result["status"] != "success":
+                failed += 1
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if output:
+            out.close()
+    
+    print(f"Completed {len(items)} queries ({failed} failed) in {time.monotonic() - start:.1f}s", file=sys.stderr)
+
+async def run_bench(args):
+    """Run a load test against the API server and print its report."""
+    try:
+        duration = parse_duration(args.duration)
+        print(f"Sending '{args.scenario}' requests to {args.url} for {duration:g}s...", file=sys.stderr)
+        report = await run_load(args.url, args.scenario, duration, args.concurrency, args.arrival, args.rate,
+                                args.server, args.query, args.model, not args.no_cache, args.timeout)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    
+    print(format_report(report, args.url))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report.to_dict(), f, indent=2)
+        print(f"Report written to {args.output}")
+
+async def dispatch(args):
+    """Run the command selected on the command line."""
     if args.command == "list":
         list_servers()
     elif args.command == "run":
-        await run_query(args.server, args.query, args.model)
+        if args.servers and args.server:
+            print("Error: Give either a server name or --servers, not both.")
+        elif args.servers:
+            servers = [name.strip() for name in args.servers.split(",") if name.strip()]
+            await run_query(servers, args.query, args.model,
+                            use_cache=not args.no_cache, refresh_cache=args.refresh_cache,
+                            timeout=args.timeout, max_steps=args.max_steps)
+        elif args.server:
+            await run_query(args.server, args.query, args.model,
+                            use_cache=not args.no_cache, refresh_cache=args.refresh_cache,
+                            timeout=args.timeout, max_steps=args.max_steps)
+        else:
+            print("Error: A server name or --servers is required.")
+    elif args.command == "run-batch":
+        await run_batch_file(args.file, args.concurrency, args.model, args.output,
+                             not args.no_cache, args.refresh_cache, args.timeout, args.max_steps)
+    elif args.command == "bench":
+        await run_bench(args)
     elif args.command == "add":
         env_dict = None
         if args.env:
@@ -85,7 +214,9 @@ async def main_async(args):
     elif args.command == "info":
         get_server_info(args.server)
     elif args.command == "tools":
-        await list_tools(args.server, args.model)
+        # A one-shot command refreshes an outdated list only when asked to,
+        # rather than making the user wait for a background refresh on exit
+        await list_tools(args.server, refresh=args.refresh, revalidate=False)
     else:
         parser = create_parser()
         parser.print_help()
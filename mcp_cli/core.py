@@ -3,21 +3,57 @@ Core functionality for the MCP CLI.
 """
 
 import asyncio
+import functools
 import json
+import logging
+import math
 import os
 import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Sequence, Tuple, Union
 
 import dotenv
-from langchain_openai import ChatOpenAI
 
-from mcp_use import MCPAgent, MCPClient
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
-# Get the project root directory
-# Try to find the project root by first checking if we're in development mode
-def get_project_root():
-    """Get the absolute path to the project root directory."""
+from mcp_cli import events, metrics, tracing
+from mcp_cli.cache import (
+    DEFAULT_QUERY_CACHE_ENTRIES, DEFAULT_QUERY_CACHE_TTL, QueryResultCache, ToolCallCache, ToolSchemaCache,
+    query_cache_key
+)
+from mcp_cli.events import EventCallback, QueryEvent
+from mcp_cli.llm import close_llm_registry, get_llm_registry, needs_openai_key
+from mcp_cli.pool import (
+    ServerBusy, close_session_pool, get_session_pool, validate_pool_settings, validate_server_limits
+)
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR_NAME = 'mcp-cli-project'
+DEFAULT_MODEL = "gpt-3.5-turbo"
+DEFAULT_MAX_STEPS = 30
+
+@functools.lru_cache(maxsize=None)
+def get_project_root() -> str:
+    """Get the absolute path to the project root directory.
+    
+    The location is resolved on first use and then memoized. Resolution
+    only inspects the filesystem; it never creates directories. Set
+    ``MCP_CLI_HOME`` to choose the location explicitly.
+    """
+    home = os.environ.get("MCP_CLI_HOME")
+    if home:
+        return os.path.abspath(os.path.expanduser(home))
+    
     # First check if we're running from the project directory
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_dir = os.path.abspath(os.path.join(current_dir, '..'))
@@ -28,30 +64,45 @@ def get_project_root():
     
     # If we're running from an installed package, use the current working directory
     cwd = os.getcwd()
-    if os.path.basename(cwd) == 'mcp-cli-project':
+    if os.path.basename(cwd) == PROJECT_DIR_NAME:
         return cwd
     
     # Fallback to checking if 'mcp-cli-project' directory exists in the current path
-    mcp_cli_dir = os.path.join(cwd, 'mcp-cli-project')
-    if os.path.exists(mcp_cli_dir) and os.path.isdir(mcp_cli_dir):
+    mcp_cli_dir = os.path.join(cwd, PROJECT_DIR_NAME)
+    if os.path.isdir(mcp_cli_dir):
         return mcp_cli_dir
     
     # Last resort, check parent directory
     parent_dir = os.path.abspath(os.path.join(cwd, '..'))
-    if os.path.basename(parent_dir) == 'mcp-cli-project':
+    if os.path.basename(parent_dir) == PROJECT_DIR_NAME:
         return parent_dir
     
-    # If all else fails, create a directory in the current working directory
-    mcp_cli_dir = os.path.join(cwd, 'mcp-cli-project')
-    if not os.path.exists(mcp_cli_dir):
-        os.makedirs(mcp_cli_dir)
+    # If all else fails, use a directory in the current working directory;
+    # it is created by ensure_config_dir() when the config is first written
     return mcp_cli_dir
 
-# Constants
-PROJECT_ROOT = get_project_root()
-DEFAULT_CONFIG_DIR = os.path.join(PROJECT_ROOT, 'config')
-DEFAULT_CONFIG_FILE = os.path.join(DEFAULT_CONFIG_DIR, 'config.json')
-DEFAULT_MODEL = "gpt-3.5-turbo"
+def get_config_dir() -> str:
+    """Get the directory holding the configuration file."""
+    return os.path.join(get_project_root(), 'config')
+
+def get_config_file() -> str:
+    """Get the path of the configuration file."""
+    return os.path.join(get_config_dir(), 'config.json')
+
+def __getattr__(name):
+    """Resolve the legacy path constants on first access.
+    
+    PROJECT_ROOT, DEFAULT_CONFIG_DIR and DEFAULT_CONFIG_FILE used to be
+    computed at import time; they stay available but no longer cost
+    anything until they are used.
+    """
+    if name == 'PROJECT_ROOT':
+        return get_project_root()
+    if name == 'DEFAULT_CONFIG_DIR':
+        return get_config_dir()
+    if name == 'DEFAULT_CONFIG_FILE':
+        return get_config_file()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Backup constants (for compatibility with existing installations)
 LEGACY_CONFIG_DIR = os.path.expanduser("~/.mcp-cli")
@@ -59,43 +110,197 @@ LEGACY_CONFIG_FILE = os.path.join(LEGACY_CONFIG_DIR, "config.json")
 
 def ensure_config_dir():
     """Ensure the configuration directory exists."""
-    if not os.path.exists(DEFAULT_CONFIG_DIR):
-        os.makedirs(DEFAULT_CONFIG_DIR)
+    config_dir = get_config_dir()
+    config_file = get_config_file()
+    if not os.path.exists(config_dir):
+        os.makedirs(config_dir)
     
-    if not os.path.exists(DEFAULT_CONFIG_FILE):
+    if not os.path.exists(config_file):
         # Check if there's a legacy config file we should migrate
         if os.path.exists(LEGACY_CONFIG_FILE):
             try:
                 with open(LEGACY_CONFIG_FILE, "r") as f:
                     legacy_config = json.load(f)
                 
-                with open(DEFAULT_CONFIG_FILE, "w") as f:
+                with open(config_file, "w") as f:
                     json.dump(legacy_config, f, indent=2)
                 
-                print(f"Migrated configuration from {LEGACY_CONFIG_FILE} to {DEFAULT_CONFIG_FILE}")
+                print(f"Migrated configuration from {LEGACY_CONFIG_FILE} to {config_file}")
                 return
             except Exception as e:
                 print(f"Failed to migrate legacy configuration: {e}")
         
         # If no legacy config or migration failed, create a new empty config
-        with open(DEFAULT_CONFIG_FILE, "w") as f:
+        with open(config_file, "w") as f:
             json.dump({"mcpServers": {}}, f, indent=2)
 
-def load_config() -> Dict[str, Any]:
-    """Load the configuration file."""
-    ensure_config_dir()
-    with open(DEFAULT_CONFIG_FILE, "r") as f:
-        return json.load(f)
+class FrozenDict(dict):
+    """Read-only dictionary used for shared configuration views.
+    
+    It is still a ``dict``, so it can be passed to ``json.dump`` and
+    ``jsonify`` directly, but every mutating method raises ``TypeError``.
+    """
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Shared configuration is read-only; use load_config() for a mutable copy")
+    
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    
+    def __copy__(self):
+        return thaw(self)
+    
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts to ``FrozenDict`` and lists to tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value: Any) -> Any:
+    """Recursively convert a frozen configuration back to plain dicts and lists."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+# Parsed configuration, reused until the file's mtime, size or inode changes
+_config_cache: Dict[str, Any] = {"stat": None, "config": None}
+_config_cache_lock = threading.Lock()
+
+def _config_stat() -> tuple:
+    path = get_config_file()
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size, st.st_ino)
+
+def load_config(readonly: bool = False) -> Dict[str, Any]:
+    """Load the configuration file.
+    
+    The parsed file is cached in memory and only re-read when its
+    modification time, size or inode changes.
+    
+    Args:
+        readonly: If True, return the shared read-only view of the cache
+            instead of a private mutable copy. Use this on hot paths that
+            only read the configuration.
+    """
+    try:
+        stat = _config_stat()
+    except FileNotFoundError:
+        ensure_config_dir()
+        stat = _config_stat()
+    
+    with _config_cache_lock:
+        if _config_cache["stat"] != stat:
+            with open(stat[0], "r") as f:
+                _config_cache["config"] = freeze(json.load(f))
+            _config_cache["stat"] = stat
+        config = _config_cache["config"]
+    
+    return config if readonly else thaw(config)
+
+# Serializes config writers within the process; the lock file serializes
+# them across processes. The lock is re-entrant so helpers like add_server()
+# can be used inside a config_transaction().
+_config_write_lock = threading.RLock()
+_config_lock_state: Dict[str, Any] = {"depth": 0, "file": None, "transaction": None}
+
+@contextmanager
+def config_lock():
+    """Hold an exclusive lock on the configuration file."""
+    with _config_write_lock:
+        if _config_lock_state["depth"] == 0:
+            ensure_config_dir()
+            lock_file = open(get_config_file() + ".lock", "a+")
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            _config_lock_state["file"] = lock_file
+        _config_lock_state["depth"] += 1
+        try:
+            yield
+        finally:
+            _config_lock_state["depth"] -= 1
+            if _config_lock_state["depth"] == 0:
+                lock_file = _config_lock_state["file"]
+                _config_lock_state["file"] = None
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                lock_file.close()
+
+def _write_config_file(config: Dict[str, Any]):
+    """Write the configuration to a temporary file and rename it into place.
+    
+    Readers either see the old file or the new one, never a partial write.
+    """
+    config_file = get_config_file()
+    directory = os.path.dirname(config_file)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".config.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(config, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(config_file):
+            os.chmod(tmp_path, os.stat(config_file).st_mode & 0o777)
+        os.replace(tmp_path, config_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
 
 def save_config(config: Dict[str, Any]):
-    """Save the configuration file."""
-    ensure_config_dir()
-    with open(DEFAULT_CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=2)
+    """Save the configuration file atomically."""
+    with config_lock():
+        _write_config_file(config)
+        with _config_cache_lock:
+            # Prime the cache so a write within the filesystem's timestamp
+            # resolution can't leave a stale entry behind
+            _config_cache["config"] = freeze(config)
+            _config_cache["stat"] = _config_stat()
+
+@contextmanager
+def config_transaction():
+    """Modify the configuration under an exclusive lock.
+    
+    Yields a mutable copy of the current configuration. When the block exits
+    normally, the configuration is written back once, atomically, if it
+    changed; if the block raises, nothing is written. Nested transactions in
+    the same thread share the outer transaction's configuration.
+    
+    Example:
+        with config_transaction() as config:
+            for name, server in new_servers.items():
+                config["mcpServers"][name] = server
+    """
+    with config_lock():
+        if _config_lock_state["transaction"] is not None:
+            yield _config_lock_state["transaction"]
+            return
+        
+        config = load_config()
+        original = load_config()
+        _config_lock_state["transaction"] = config
+        try:
+            yield config
+            if config != original:
+                save_config(config)
+        finally:
+            _config_lock_state["transaction"] = None
 
 def list_servers():
     """List all configured MCP servers."""
-    config = load_config()
+    config = load_config(readonly=True)
     servers = config.get("mcpServers", {})
     
     if not servers:
@@ -109,70 +314,425 @@ def list_servers():
         args = " ".join(server_config.get("args", []))
         print(f"  - {name}: {command} {args}")
 
-async def run_query(server_name: str, query: str, model: str = DEFAULT_MODEL, return_result: bool = False):
-    """Run a query against a specified MCP server.
+def _server_names(server_name: Union[str, Sequence[str]]) -> List[str]:
+    """Normalize a server name or list of names to a list without duplicates."""
+    names = [server_name] if isinstance(server_name, str) else server_name
+    return list(dict.fromkeys(names))
+
+def _check_query(server_names: List[str], model: str = DEFAULT_MODEL) -> Any:
+    """Check that a query can be run against the given servers with a model.
     
-    Args:
-        server_name: Name of the server to use
-        query: Query to run
-        model: OpenAI model to use
-        return_result: If True, returns the result instead of printing it
-        
     Returns:
-        If return_result is True, returns the result as a string,
-        otherwise prints the result and returns None.
+        The configuration of each server by name, or an error message string
+        without an "Error:" prefix.
     """
-    config = load_config()
+    config = load_config(readonly=True)
     servers = config.get("mcpServers", {})
     
-    if server_name not in servers:
-        message = f"Error: Server '{server_name}' not found."
-        message += "\nAvailable servers:"
-        for name in servers.keys():
-            message += f"\n  - {name}"
-        if return_result:
-            return message
-        print(message)
-        return
+    if not server_names:
+        return "No server specified."
     
-    # Create a temporary config with just the selected server
-    temp_config = {"mcpServers": {server_name: servers[server_name]}}
+    for server_name in server_names:
+        if server_name not in servers:
+            message = f"Server '{server_name}' not found."
+            message += "\nAvailable servers:"
+            for name in servers.keys():
+                message += f"\n  - {name}"
+            return message
     
     # Load environment variables
     dotenv.load_dotenv()
     
-    # Check if OPENAI_API_KEY is set
-    if not os.getenv("OPENAI_API_KEY"):
-        message = "Error: OPENAI_API_KEY environment variable not set."
+    # Check if OPENAI_API_KEY is set, unless the model runs elsewhere
+    if needs_openai_key(model) and not os.getenv("OPENAI_API_KEY"):
+        message = "OPENAI_API_KEY environment variable not set."
         message += "\nPlease set it in your .env file or as an environment variable."
-        if return_result:
-            return message
-        print(message)
-        return
+        return message
     
-    result_output = []
-    def capture_print(text):
-        if return_result:
-            result_output.append(text)
-        print(text)
+    return {name: servers[name] for name in server_names}
+
+def validate_query_limits(server_name: str, server_config: Dict[str, Any]) -> Tuple[Optional[float], Optional[int]]:
+    """Check a server's ``queryTimeout`` and ``maxSteps`` settings.
+    
+    Returns:
+        ``(query_timeout, max_steps)``, each None if not set
+    
+    Raises:
+        ValueError: If ``queryTimeout`` is not a positive, finite number of
+            seconds or ``maxSteps`` not a positive integer
+    """
+    timeout = server_config.get("queryTimeout")
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+                                or not math.isfinite(timeout) or timeout <= 0):
+        raise ValueError(f"Server '{server_name}': queryTimeout must be a positive number of seconds, not {timeout!r}")
+    max_steps = server_config.get("maxSteps")
+    if max_steps is not None and (isinstance(max_steps, bool) or not isinstance(max_steps, int) or max_steps < 1):
+        raise ValueError(f"Server '{server_name}': maxSteps must be a positive integer, not {max_steps!r}")
+    return timeout, max_steps
+
+def _query_limits(servers: Dict[str, Dict[str, Any]], timeout: Optional[float],
+                  max_steps: Optional[int]) -> Tuple[Optional[float], int]:
+    """Resolve a query's deadline and step budget.
+    
+    Limits not given for the query come from the ``queryTimeout`` and
+    ``maxSteps`` settings of its servers, taking the strictest when several
+    servers set one.
+    
+    Raises:
+        ValueError: If a limit is not positive and finite, or a server's
+            settings are invalid
+    """
+    limits = [validate_query_limits(name, config) for name, config in servers.items()]
+    if timeout is None:
+        timeouts = [server_timeout for server_timeout, _ in limits if server_timeout is not None]
+        timeout = min(timeouts) if timeouts else None
+    if max_steps is None:
+        budgets = [server_steps for _, server_steps in limits if server_steps is not None]
+        max_steps = min(budgets) if budgets else DEFAULT_MAX_STEPS
+    
+    if timeout is not None and (not math.isfinite(timeout) or timeout <= 0):
+        raise ValueError("The timeout must be a positive number of seconds")
+    if max_steps < 1:
+        raise ValueError("The step budget must be at least 1")
+    return timeout, max_steps
+
+async def _run_with_deadline(coroutine: Awaitable[Any], timeout: Optional[float]) -> Tuple[bool, Any]:
+    """Await ``coroutine``, cancelling it once ``timeout`` seconds have passed.
     
+    Unlike ``asyncio.wait_for``, a timeout raised inside the coroutine is
+    not mistaken for the deadline passing.
+    
+    Returns:
+        ``(True, result)`` if it finished in time, otherwise ``(False, None)``
+        once it has been cancelled and has cleaned up.
+    """
+    task = asyncio.ensure_future(coroutine)
     try:
-        capture_print(f"Connecting to MCP server '{server_name}'...")
-        client = MCPClient.from_dict(temp_config)
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        raise
+    if not done:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return False, None
+    return True, task.result()
+
+async def _execute_query(servers: Dict[str, Dict[str, Any]], query: str, model: str,
+                         emit: EventCallback, stream_tokens: bool = False, block: bool = False,
+                         use_cache: bool = True, refresh_cache: bool = False,
+                         trace_id: Optional[str] = None, timeout: Optional[float] = None,
+                         max_steps: Optional[int] = None) -> str:
+    """Run the agent for a query on pooled sessions, reporting progress through ``emit``.
+    
+    The run first takes a slot from the admission limiter of each server, so
+    at most ``maxConcurrency`` queries run against a server at once. With
+    several servers, their sessions are connected concurrently and a single
+    agent sees the tools of all of them.
+    
+    If the query result cache is enabled, a cached answer is returned
+    without running the agent, as a ``result`` event with ``cached`` set.
+    The ``result`` event also carries the time spent in each phase and the
+    query's trace id.
+    
+    Once the deadline passes, waiting included, the agent is cancelled,
+    its sessions go back to the pool, and whatever it produced so far is
+    returned as a ``result`` event with ``timed_out`` set. An agent that
+    uses up its step budget likewise returns its partial result, with
+    ``max_steps_reached`` set. Partial results are not cached.
+    """
+    timeout, max_steps = _query_limits(servers, timeout, max_steps)
+    label = ",".join(servers)
+    timings = metrics.Timings()
+    trace = tracing.Trace("query", trace_id, get_span_processor(), **{
+        "mcp.servers": label, "llm.model": model, "query.size": len(query)
+    })
+    status = "error"
+    cached = False
+    timed_out = False
+    partial = events.PartialResult()
+    try:
+        cache = get_query_cache() if use_cache else None
+        result = None
+        if cache is not None:
+            key = query_cache_key(servers, model, query)
+            if not refresh_cache:
+                with timings.phase(metrics.PHASE_CACHE):
+                    result = cache.get(key)
         
-        capture_print(f"Using OpenAI model '{model}'...")
-        llm = ChatOpenAI(model=model)
+        cached = result is not None
+        if not cached:
+            finished, result = await _run_with_deadline(
+                _run_agent(servers, query, model, emit, stream_tokens, block, timings, trace, max_steps, partial),
+                timeout
+            )
+            if not finished:
+                timed_out = True
+                logger.info(f"Query on {label} timed out after {timeout}s")
+                result = partial.text()
+            elif cache is not None and not partial.max_steps_reached:
+                cache.put(key, result)
+        if cached:
+            status = "cached"
+        elif timed_out:
+            status = "timeout"
+        else:
+            status = "max_steps" if partial.max_steps_reached else "success"
+    except ServerBusy:
+        status = "rejected"
+        raise
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    finally:
+        timings.finish()
+        metrics.record_query(label, model, status, timings)
+        trace.finish("ok" if status in ("success", "cached") else "error",
+                     **{"query.status": status, "query.cached": cached, "query.max_steps": max_steps})
+    
+    emit(QueryEvent(events.RESULT, {
+        "result": result, "cached": cached, "timed_out": timed_out,
+        "max_steps_reached": partial.max_steps_reached, "timings": timings.to_dict(), "trace_id": trace.trace_id
+    }))
+    return result
+
+async def _run_agent(servers: Dict[str, Dict[str, Any]], query: str, model: str, emit: EventCallback,
+                     stream_tokens: bool, block: bool, timings: metrics.Timings, trace: tracing.Trace,
+                     max_steps: int, partial: events.PartialResult) -> str:
+    """Run the agent for a query on pooled sessions.
+    
+    Each phase is recorded in ``timings`` and ``trace``, and what the agent
+    produces along the way is kept in ``partial``. If the agent runs out of
+    steps, the partial result is returned.
+    
+    If the run is cancelled between tool calls, its sessions are still
+    returned to the pool. Cancelling it during a tool call closes them
+    instead, which stops the servers working on the call.
+    """
+    # Imported here so that config-only commands don't load langchain
+    from mcp_use import MCPAgent
+    try:
+        from langgraph.errors import GraphRecursionError as StepLimitError
+    except ImportError:
+        # Older mcp-use releases stop at max_steps by themselves
+        StepLimitError = ()
+    
+    label = ",".join(servers)
+    pool = get_session_pool(load_config(readonly=True).get("sessionPool", {}))
+    cancelled = None
+    phase_start = time.monotonic()
+    async with pool.admit(servers, block):
+        timings.add(metrics.PHASE_QUEUE, time.monotonic() - phase_start)
+        trace.record("admission", time.monotonic() - phase_start)
+        emit(QueryEvent(events.CONNECT, {"server": label, "trace_id": trace.trace_id}))
         
-        capture_print("Initializing agent...")
-        agent = MCPAgent(llm=llm, client=client, max_steps=30)
+        phase_start = time.monotonic()
+        async with pool.sessions(servers) as client:
+            timings.add(metrics.PHASE_SESSION, time.monotonic() - phase_start)
+            trace.record("session.acquire", time.monotonic() - phase_start)
+            emit(QueryEvent(events.CONNECTED, {"server": label, "model": model}))
+            
+            # LLM clients are shared between queries to reuse their connections
+            llm_registry = get_llm_registry(load_config(readonly=True).get("llm", {}))
+            callbacks = [metrics.llm_timing_callback_handler(timings, model), events.partial_result_callback_handler(partial)]
+            if trace.processor is not None:
+                callbacks.append(tracing.trace_callback_handler(trace, model))
+            if stream_tokens:
+                callbacks.append(events.token_callback_handler(emit))
+            llm = llm_registry.for_request(model, callbacks, streaming=stream_tokens)
+            agent = MCPAgent(llm=llm, client=client, max_steps=max_steps)
+            
+            middlewares = [
+                events.tool_event_middleware(emit), metrics.tool_timing_middleware(timings),
+                events.partial_result_middleware(partial)
+            ]
+            if trace.processor is not None:
+                middlewares.append(tracing.tool_trace_middleware(trace))
+            if any(config.get("cacheableTools") for config in servers.values()):
+                middlewares.append(get_tool_call_cache().middleware(servers))
+            
+            with events.intercept_tool_calls(client, *middlewares):
+                with timings.phase(metrics.PHASE_AGENT):
+                    try:
+                        # The pool owns the sessions, so the agent must not close
+                        # them on errors; initialized here, it reuses them
+                        await agent.initialize()
+                        result = await agent.run(query, max_steps=max_steps, manage_connector=False)
+                    except StepLimitError:
+                        logger.info(f"Query on {label} used up its {max_steps} steps")
+                        partial.max_steps_reached = True
+                        result = partial.text()
+                    except asyncio.CancelledError as e:
+                        if partial.tool_call_interrupted:
+                            raise
+                        # No request is outstanding, so the sessions can be reused
+                        cancelled = e
+            trace.end_step()
+            
+            phase_start = time.monotonic()
+        timings.add(metrics.PHASE_RELEASE, time.monotonic() - phase_start)
+        trace.record("session.release", time.monotonic() - phase_start)
+    
+    if cancelled is not None:
+        raise cancelled
+    return result
+
+async def execute_query(server_name: Union[str, Sequence[str]], query: str, model: str = DEFAULT_MODEL,
+                        emit: Optional[EventCallback] = None, stream_tokens: bool = False,
+                        block: bool = False, use_cache: bool = True, refresh_cache: bool = False,
+                        trace_id: Optional[str] = None, timeout: Optional[float] = None,
+                        max_steps: Optional[int] = None) -> str:
+    """Run a query against a server and return the agent's answer.
+    
+    Unlike ``run_query``, nothing is printed and failures raise.
+    
+    Args:
+        server_name: Name of the server to use, or several names to give
+            one agent the tools of all of them
+        query: Query to run
+        model: Model to use, optionally with a provider prefix such as ``replay:``
+        emit: Optional callback receiving a ``QueryEvent`` for each step
+        stream_tokens: If True, emit a ``token`` event per LLM token
+        block: If True, wait for the server even when its queue is full
+        use_cache: If False, neither read nor store the result in the query cache
+        refresh_cache: If True, run the agent even on a cache hit and store the new result
+        trace_id: Trace id to record the query under, or None for a new one
+        timeout: Seconds the whole query may take, or None for the servers'
+            ``queryTimeout``; past it, the partial result is returned and the
+            ``result`` event has ``timed_out`` set
+        max_steps: Maximum agent steps, or None for the servers' ``maxSteps``
+            (default: 30); once used up, the partial result is returned and
+            the ``result`` event has ``max_steps_reached`` set
+        
+    Raises:
+        ValueError: If a server is not configured, no API key is set or a
+            limit is invalid
+        ServerBusy: If a server's ``maxQueued`` limit is reached
+    """
+    checked = _check_query(_server_names(server_name), model)
+    if isinstance(checked, str):
+        raise ValueError(checked)
+    return await _execute_query(checked, query, model, emit or (lambda event: None), stream_tokens, block,
+                                use_cache, refresh_cache, trace_id, timeout, max_steps)
+
+async def stream_query(server_name: Union[str, Sequence[str]], query: str, model: str = DEFAULT_MODEL,
+                       stream_tokens: bool = True, use_cache: bool = True,
+                       refresh_cache: bool = False, trace_id: Optional[str] = None,
+                       timeout: Optional[float] = None, max_steps: Optional[int] = None) -> AsyncIterator[QueryEvent]:
+    """Run a query and yield its progress as it happens.
+    
+    Yields ``connect``/``connected`` when the session is leased,
+    ``tool_start``/``tool_end`` around every tool call, ``token`` for each
+    LLM token (if ``stream_tokens`` is set) and finally either ``result``
+    or ``error``. A cached answer yields only ``result``. Closing the
+    generator early cancels the query.
+    
+    Args:
+        server_name: Name of the server to use, or a list of names
+        query: Query to run
+        model: Model to use, optionally with a provider prefix such as ``replay:``
+        stream_tokens: If True, stream LLM output token by token
+        use_cache: If False, neither read nor store the result in the query cache
+        refresh_cache: If True, run the agent even on a cache hit
+        trace_id: Trace id to record the query under, or None for a new one
+        timeout: Seconds the whole query may take, or None for the servers' default
+        max_steps: Maximum agent steps, or None for the servers' default
+    """
+    checked = _check_query(_server_names(server_name), model)
+    if isinstance(checked, str):
+        yield QueryEvent(events.ERROR, {"message": f"Error: {checked}"})
+        return
+    
+    queue: "asyncio.Queue[Optional[QueryEvent]]" = asyncio.Queue()
+    
+    async def run():
+        try:
+            await _execute_query(checked, query, model, queue.put_nowait, stream_tokens,
+                                 use_cache=use_cache, refresh_cache=refresh_cache, trace_id=trace_id,
+                                 timeout=timeout, max_steps=max_steps)
+        except ServerBusy as e:
+            queue.put_nowait(QueryEvent(events.ERROR, {
+                "message": f"Error: {e}", "server": e.server_name, "retry_after": e.retry_after
+            }))
+        except Exception as e:
+            queue.put_nowait(QueryEvent(events.ERROR, {"message": f"Error: {e}"}))
+        finally:
+            queue.put_nowait(None)
+    
+    task = asyncio.ensure_future(run())
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield event
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+async def run_query(server_name: Union[str, Sequence[str]], query: str, model: str = DEFAULT_MODEL, return_result: bool = False,
+                    use_cache: bool = True, refresh_cache: bool = False, timeout: Optional[float] = None,
+                    max_steps: Optional[int] = None):
+    """Run a query against a specified MCP server.
+    
+    Args:
+        server_name: Name of the server to use, or several names to run
+            one agent over all of them
+        query: Query to run
+        model: Model to use, optionally with a provider prefix such as ``replay:``
+        return_result: If True, returns the result instead of printing it
+        use_cache: If False, neither read nor store the result in the query cache
+        refresh_cache: If True, run the agent even on a cache hit
+        timeout: Seconds the query may take before its partial result is
+            returned, or None for the servers' ``queryTimeout``
+        max_steps: Maximum agent steps, or None for the servers' ``maxSteps``
         
-        capture_print(f"Running query: {query}")
-        capture_print("Processing (this may take a moment)...")
-        result = await agent.run(query, max_steps=30)
+    Returns:
+        If return_result is True, returns the result as a string,
+        otherwise prints the result and returns None.
+    """
+    checked = _check_query(_server_names(server_name), model)
+    if isinstance(checked, str):
+        if return_result:
+            return f"Error: {checked}"
+        print(f"Error: {checked}")
+        return
+    
+    def show_progress(event: QueryEvent):
+        if event.type == events.CONNECT:
+            if len(checked) == 1:
+                print(f"Connecting to MCP server '{next(iter(checked))}'...")
+            else:
+                print(f"Connecting to MCP servers {', '.join(repr(name) for name in checked)}...")
+        elif event.type == events.CONNECTED:
+            print(f"Using model '{model}'...")
+            print(f"Running query: {query}")
+            print("Processing (this may take a moment)...")
+        elif event.type == events.TOOL_START:
+            print(f"Calling tool '{event.data['tool']}'...")
+        elif event.type == events.RESULT and event.data.get("cached"):
+            print("Using cached result...")
+        elif event.type == events.RESULT:
+            outcome.append(event)
+    
+    outcome: List[QueryEvent] = []
+    try:
+        result = await _execute_query(checked, query, model, show_progress,
+                                      use_cache=use_cache, refresh_cache=refresh_cache,
+                                      timeout=timeout, max_steps=max_steps)
         
-        capture_print("\n--- Result ---")
-        capture_print(result)
-        capture_print("-------------")
+        if outcome and outcome[0].data.get("timed_out"):
+            print(f"\n--- Partial result (timed out after {outcome[0].data['timings']['total']:.2f}s) ---")
+            print(result or "(the agent produced no output before the deadline)")
+        elif outcome and outcome[0].data.get("max_steps_reached"):
+            print("\n--- Partial result (the agent used up its steps) ---")
+            print(result or "(the agent produced no output within its steps)")
+        else:
+            print("\n--- Result ---")
+            print(result)
+        print("-------------")
         
         if return_result:
             return result
@@ -182,19 +742,13 @@ async def run_query(server_name: str, query: str, model: str = DEFAULT_MODEL, re
         if return_result:
             return message
         print(message)
-    finally:
-        # Clean up
-        if 'client' in locals() and hasattr(client, 'sessions') and client.sessions:
-            capture_print("Closing sessions...")
-            await client.close_all_sessions()
+
+async def invalidate_server_sessions(name: str):
+    """Close the pooled sessions of a server whose configuration changed or that was removed."""
+    await get_session_pool().invalidate(name)
 
 def add_server(name: str, command: str, args: List[str], env: Optional[Dict[str, str]] = None):
     """Add a new MCP server configuration."""
-    config = load_config()
-    
-    if "mcpServers" not in config:
-        config["mcpServers"] = {}
-    
     server_config = {
         "command": command,
         "args": args
@@ -203,33 +757,52 @@ def add_server(name: str, command: str, args: List[str], env: Optional[Dict[str,
     if env:
         server_config["env"] = env
     
-    config["mcpServers"][name] = server_config
-    save_config(config)
+    with config_transaction() as config:
+        config.setdefault("mcpServers", {})[name] = server_config
     
     print(f"MCP server '{name}' added successfully.")
 
 def remove_server(name: str):
     """Remove an MCP server configuration."""
-    config = load_config()
-    
-    if "mcpServers" not in config or name not in config["mcpServers"]:
-        print(f"Error: Server '{name}' not found.")
-        return
-    
-    del config["mcpServers"][name]
-    save_config(config)
+    with config_transaction() as config:
+        if "mcpServers" not in config or name not in config["mcpServers"]:
+            print(f"Error: Server '{name}' not found.")
+            return
+        
+        del config["mcpServers"][name]
     
     print(f"MCP server '{name}' removed successfully.")
 
 def export_config(filepath: str):
     """Export the configuration to a file."""
-    config = load_config()
+    config = load_config(readonly=True)
     
     with open(filepath, "w") as f:
         json.dump(config, f, indent=2)
     
     print(f"Configuration exported to {filepath}")
 
+def read_config_file(filepath: str) -> Dict[str, Any]:
+    """Read and check a configuration file to import.
+    
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If the file is not valid JSON or a server has invalid
+            ``maxConcurrency``, ``maxQueued``, ``queryTimeout`` or ``maxSteps``
+            settings, or invalid ``sessionPool`` settings
+    """
+    with open(filepath, "r") as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError:
+            raise ValueError(f"File '{filepath}' is not a valid JSON file.")
+    
+    for name, server_config in config.get("mcpServers", {}).items():
+        validate_server_limits(name, server_config)
+        validate_query_limits(name, server_config)
+    validate_pool_settings(config.get("sessionPool", {}))
+    return config
+
 def import_config(filepath: str):
     """Import configuration from a file."""
     if not os.path.exists(filepath):
@@ -237,17 +810,17 @@ def import_config(filepath: str):
         return
     
     try:
-        with open(filepath, "r") as f:
-            config = json.load(f)
-        
-        save_config(config)
-        print(f"Configuration imported from {filepath}")
-    except json.JSONDecodeError:
-        print(f"Error: File '{filepath}' is not a valid JSON file.")
+        config = read_config_file(filepath)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    
+    save_config(config)
+    print(f"Configuration imported from {filepath}")
 
 def get_server_info(server_name: str):
     """Get detailed information about a server."""
-    config = load_config()
+    config = load_config(readonly=True)
     servers = config.get("mcpServers", {})
     
     if server_name not in servers:
@@ -259,25 +832,226 @@ def get_server_info(server_name: str):
     print(f"Server: {server_name}")
     print(f"Command: {server_config.get('command', 'N/A')}")
     print(f"Arguments: {' '.join(server_config.get('args', []))}")
+    if server_config.get("replay"):
+        print(f"Replays recording: {server_config['replay']}")
+    if server_config.get("record"):
+        print(f"Records traffic to: {server_config['record']}")
     
     if "env" in server_config:
         print("Environment variables:")
         for key, value in server_config["env"].items():
             print(f"  {key}={value}")
 
-async def list_tools(server_name: str, model: str = DEFAULT_MODEL, return_result: bool = False):
+@dataclass
+class ToolInfo:
+    """A tool exposed by an MCP server."""
+    name: str
+    description: str = ""
+    input_schema: Dict[str, Any] = field(default_factory=dict)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the tool to a JSON-serializable dictionary."""
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ToolInfo":
+        """Create a tool from a dictionary produced by ``to_dict``."""
+        return cls(
+            name=data["name"],
+            description=data.get("description") or "",
+            input_schema=data.get("input_schema") or {}
+        )
+
+_tool_cache: Optional[ToolSchemaCache] = None
+
+def get_tool_cache() -> ToolSchemaCache:
+    """Get the on-disk cache of server tool lists."""
+    global _tool_cache
+    if _tool_cache is None:
+        _tool_cache = ToolSchemaCache(os.path.join(get_config_dir(), "cache", "tools"))
+    return _tool_cache
+
+_tool_call_cache: Optional[ToolCallCache] = None
+
+def get_tool_call_cache() -> ToolCallCache:
+    """Get the process-wide cache of tool call results."""
+    global _tool_call_cache
+    if _tool_call_cache is None:
+        _tool_call_cache = ToolCallCache()
+    return _tool_call_cache
+
+_query_cache: Optional[QueryResultCache] = None
+_query_cache_settings: Optional[tuple] = None
+
+def get_query_cache() -> Optional[QueryResultCache]:
+    """Get the query result cache, or None if it is not enabled.
+    
+    The cache is opt-in through a ``queryCache`` section in the config file::
+    
+        "queryCache": {"ttl": 3600, "maxEntries": 1000, "persist": true}
+    
+    With ``persist`` set, results are also stored in a SQLite database under
+    the config directory, shared by every process using that directory.
+    """
+    global _query_cache, _query_cache_settings
+    settings = load_config(readonly=True).get("queryCache")
+    if not settings or not settings.get("enabled", True):
+        return None
+    
+    db_path = os.path.join(get_config_dir(), "cache", "queries.db") if settings.get("persist") else None
+    key = (settings.get("ttl", DEFAULT_QUERY_CACHE_TTL), settings.get("maxEntries", DEFAULT_QUERY_CACHE_ENTRIES), db_path)
+    if _query_cache is None or _query_cache_settings != key:
+        if _query_cache is not None:
+            _query_cache.close()
+        _query_cache = QueryResultCache(ttl=key[0], max_entries=key[1], db_path=db_path)
+        _query_cache_settings = key
+    return _query_cache
+
+_span_processor: Optional[tracing.SpanProcessor] = None
+_span_processor_settings: Optional[str] = None
+_span_processor_lock = threading.Lock()
+
+def get_span_processor() -> Optional[tracing.SpanProcessor]:
+    """Get the span processor exporting query traces, or None if tracing is off.
+    
+    Tracing is opt-in through a ``tracing`` section in the config file; see
+    ``mcp_cli.tracing``. JSONL traces default to ``traces/traces.jsonl``
+    under the config directory.
+    """
+    global _span_processor, _span_processor_settings
+    settings = load_config(readonly=True).get("tracing")
+    if not settings or not settings.get("enabled", True):
+        settings = None
+    key = json.dumps(settings, sort_keys=True)
+    
+    with _span_processor_lock:
+        if key != _span_processor_settings:
+            if _span_processor is not None:
+                _span_processor.shutdown()
+                _span_processor = None
+            _span_processor_settings = key
+            if settings is not None:
+                try:
+                    exporter = tracing.create_exporter(settings, os.path.join(get_config_dir(), "traces", "traces.jsonl"))
+                    _span_processor = tracing.SpanProcessor(exporter)
+                except (ValueError, OSError) as e:
+                    logger.warning(f"Tracing disabled: {e}")
+        return _span_processor
+
+def shutdown_tracing():
+    """Export any queued spans and stop the tracing thread."""
+    global _span_processor, _span_processor_settings
+    with _span_processor_lock:
+        if _span_processor is not None:
+            _span_processor.shutdown()
+        _span_processor = None
+        _span_processor_settings = None
+
+async def discover_tools(server_name: str, server_config: Optional[Dict[str, Any]] = None,
+                         refresh: bool = False) -> List[ToolInfo]:
+    """Connect to a server and return the tools it exposes.
+    
+    Only the MCP session is opened; no LLM or agent is involved.
+    
+    Args:
+        server_name: Name of the server to use
+        server_config: Server configuration, or None to look it up in the config file
+        refresh: If True, ask the server again instead of using the list it
+            sent when the session was initialized, which a pooled session
+            may have received long ago
+        
+    Returns:
+        The tools exposed by the server.
+        
+    Raises:
+        ValueError: If the server is not configured
+        RuntimeError: If no session could be established with the server
+    """
+    if server_config is None:
+        servers = load_config(readonly=True).get("mcpServers", {})
+        if server_name not in servers:
+            raise ValueError(f"Server '{server_name}' not found")
+        server_config = servers[server_name]
+    
+    pool = get_session_pool(load_config(readonly=True).get("sessionPool", {}))
+    async with pool.session(server_name, server_config) as client:
+        session = client.sessions.get(server_name) if client.sessions else None
+        if session is None:
+            raise RuntimeError(f"Failed to connect to server '{server_name}'")
+        
+        if refresh and hasattr(session.connector, 'list_tools'):
+            server_tools = await session.connector.list_tools()
+        else:
+            # Sessions from the pool are initialized, so the connector
+            # already holds the tool list returned by the server
+            server_tools = getattr(session.connector, 'tools', None)
+        
+        tools = []
+        for tool in server_tools or []:
+            tools.append(ToolInfo(
+                name=tool.name,
+                description=getattr(tool, 'description', None) or "",
+                # MCP tools expose their schema as inputSchema
+                input_schema=getattr(tool, 'input_schema', None) or getattr(tool, 'inputSchema', None) or {}
+            ))
+        return tools
+
+async def get_server_tools(server_name: str, server_config: Optional[Dict[str, Any]] = None,
+                           refresh: bool = False, revalidate: bool = True) -> List[ToolInfo]:
+    """Get the tools exposed by a server, using the on-disk tool cache.
+    
+    A cached list is returned immediately; once it is older than the cache
+    TTL it is still returned, and a fresh copy is fetched in the background.
+    
+    Args:
+        server_name: Name of the server to use
+        server_config: Server configuration, or None to look it up in the config file
+        refresh: If True, bypass the cache and query the server
+        revalidate: If False, return an outdated cached list without fetching
+            a fresh copy, e.g. in a process about to exit
+        
+    Raises:
+        ValueError: If the server is not configured
+    """
+    if server_config is None:
+        servers = load_config(readonly=True).get("mcpServers", {})
+        if server_name not in servers:
+            raise ValueError(f"Server '{server_name}' not found")
+        server_config = servers[server_name]
+    
+    async def fetch(refresh: bool = True):
+        return [tool.to_dict() for tool in await discover_tools(server_name, server_config, refresh)]
+    
+    cache = get_tool_cache()
+    cached = None if refresh else cache.get(server_name, server_config)
+    if cached is not None:
+        tools, fresh = cached
+        if not fresh and revalidate:
+            cache.refresh_in_background(server_name, server_config, fetch)
+    else:
+        # Without a cached list this is usually the session's first
+        # discovery, so the list received on initialization is current
+        tools = await fetch(refresh)
+        cache.put(server_name, server_config, tools)
+    
+    return [ToolInfo.from_dict(tool) for tool in tools]
+
+async def list_tools(server_name: str, return_result: bool = False, refresh: bool = False,
+                     revalidate: bool = True):
     """Connect to a server and list its available tools.
     
     Args:
         server_name: Name of the server to use
-        model: OpenAI model to use
         return_result: If True, returns the result instead of printing it
+        refresh: If True, bypass the tool cache and query the server
+        revalidate: If False, show an outdated cached list with a note
+            instead of refreshing it in the background
         
     Returns:
         If return_result is True, returns the result as a string,
         otherwise prints the result and returns None.
     """
-    config = load_config()
+    config = load_config(readonly=True)
     servers = config.get("mcpServers", {})
     
     if server_name not in servers:
@@ -287,9 +1061,6 @@ async def list_tools(server_name: str, model: str = DEFAULT_MODEL, return_result
         print(message)
         return
     
-    # Create a temporary config with just the selected server
-    temp_config = {"mcpServers": {server_name: servers[server_name]}}
-    
     # Load environment variables
     dotenv.load_dotenv()
 
@@ -300,36 +1071,24 @@ async def list_tools(server_name: str, model: str = DEFAULT_MODEL, return_result
         print(text)
     
     try:
-        capture_print(f"Connecting to MCP server '{server_name}'...")
-        client = MCPClient.from_dict(temp_config)
-        
-        # Create a dummy LLM (needed to initialize the agent)
-        llm = ChatOpenAI(model=model)
+        tools = await get_server_tools(server_name, servers[server_name], refresh, revalidate)
         
-        capture_print("Initializing agent to discover tools...")
-        agent = MCPAgent(llm=llm, client=client)
+        if tools:
+            capture_print(f"\nTools available from '{server_name}':")
+            for tool in tools:
+                capture_print(f"\n• {tool.name}")
+                if tool.description:
+                    capture_print(f"  Description: {tool.description}")
+                if tool.input_schema:
+                    capture_print(f"  Parameters: {json.dumps(tool.input_schema, indent=2)}")
+        else:
+            capture_print(f"No tools found in server '{server_name}'")
         
-        # Initialize to discover tools
-        await agent.initialize()
+        if not (refresh or revalidate):
+            cached = get_tool_cache().get(server_name, servers[server_name])
+            if cached is not None and not cached[1]:
+                capture_print("\n(Cached list, possibly out of date; use --refresh to query the server)")
         
-        # Get session and its connector (which has tool info)
-        if client.sessions:
-            session = next(iter(client.sessions.values()))
-            connector = session.connector
-            
-            if hasattr(connector, 'tools') and connector.tools:
-                capture_print(f"\nTools available from '{server_name}':")
-                for tool in connector.tools:
-                    capture_print(f"\n• {tool.name}")
-                    if hasattr(tool, 'description') and tool.description:
-                        capture_print(f"  Description: {tool.description}")
-                    if hasattr(tool, 'input_schema') and tool.input_schema:
-                        capture_print(f"  Parameters: {json.dumps(tool.input_schema, indent=2)}")
-            else:
-                capture_print(f"No tools found in server '{server_name}'")
-        else:
-            capture_print(f"Failed to connect to server '{server_name}'")
-            
         if return_result:
             return "\n".join(result_output)
             
@@ -338,7 +1097,3 @@ async def list_tools(server_name: str, model: str = DEFAULT_MODEL, return_result
         if return_result:
             return message
         print(message)
-    finally:
-        # Clean up
-        if 'client' in locals() and hasattr(client, 'sessions') and client.sessions:
-            await client.close_all_sessions() 
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Query events and tool-call interception for MCP CLI.
+
+Agent runs report their progress as ``QueryEvent`` objects: connecting to a
+server, tool calls starting and finishing, LLM tokens and the final answer.
+Tool calls are observed by wrapping ``call_tool`` on the connectors of a
+leased client for the duration of a run.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+# Event types
+CONNECT = "connect"
+CONNECTED = "connected"
+TOOL_START = "tool_start"
+TOOL_END = "tool_end"
+TOKEN = "token"
+RESULT = "result"
+ERROR = "error"
+
+
+@dataclass
+class QueryEvent:
+    """A progress event emitted while a query runs."""
+    type: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the event to a JSON-serializable dictionary."""
+        return {"type": self.type, "timestamp": self.timestamp, **self.data}
+
+
+EventCallback = Callable[[QueryEvent], None]
+
+# call_next(tool_name, arguments) -> result
+ToolCall = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+# middleware(server_name, tool_name, arguments, call_next) -> result
+ToolCallMiddleware = Callable[[str, str, Dict[str, Any], ToolCall], Awaitable[Any]]
+
+
+@contextmanager
+def intercept_tool_calls(client, *middlewares: ToolCallMiddleware):
+    """Route every tool call made through ``client`` via ``middlewares``.
+
+    The first middleware is the outermost. Connectors are restored when the
+    block exits, so this must only be used on a client leased exclusively,
+    such as one obtained from the session pool.
+    """
+    patched = []
+    for server_name, session in (client.sessions or {}).items():
+        connector = session.connector
+        previous = connector.__dict__.get("call_tool")
+        call = connector.call_tool
+
+        for middleware in reversed(middlewares):
+            def wrap(middleware=middleware, call_next=call, server_name=server_name):
+                async def call_tool(name, arguments, *args, **kwargs):
+                    async def next_call(name, arguments):
+                        return await call_next(name, arguments, *args, **kwargs)
+                    return await middleware(server_name, name, arguments, next_call)
+                return call_tool
+            call = wrap()
+
+        connector.call_tool = call
+        patched.append((connector, previous))
+
+    try:
+        yield
+    finally:
+        for connector, previous in patched:
+            if previous is None:
+                del connector.call_tool
+            else:
+                connector.call_tool = previous
+
+
+def tool_event_middleware(emit: EventCallback) -> ToolCallMiddleware:
+    """Create a middleware that emits ``tool_start``/``tool_end`` events."""
+    async def middleware(server_name, name, arguments, call_next):
+        emit(QueryEvent(TOOL_START, {"server": server_name, "tool": name, "arguments": arguments}))
+        start = time.monotonic()
+        try:
+            result = await call_next(name, arguments)
+        except Exception as e:
+            emit(QueryEvent(TOOL_END, {
+                "server": server_name, "tool": name,
+                "duration": time.monotonic() - start, "error": str(e)
+            }))
+            raise
+        emit(QueryEvent(TOOL_END, {
+            "server": server_name, "tool": name,
+            "duration": time.monotonic() - start,
+            "is_error": bool(getattr(result, "isError", False))
+        }))
+        return result
+    return middleware
+
+
+def token_callback_handler(emit: EventCallback):
+    """Create a LangChain callback handler that emits a ``token`` event per LLM token."""
+    # Imported here since langchain is only needed once an agent runs
+    from langchain_core.callbacks import AsyncCallbackHandler
+
+    class TokenHandler(AsyncCallbackHandler):
+        async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+            if token:
+                emit(QueryEvent(TOKEN, {"text": token}))
+
+    return TokenHandler()
+
+
+class PartialResult:
+    """What an agent has produced so far, to answer a query cut short by its
+    deadline or step budget.
+
+    Holds the latest LLM text, including tokens of a streamed reply still
+    in progress, the output of every successful tool call, and whether a
+    tool call was cancelled before the server answered.
+    """
+
+    # Characters of each tool output kept
+    max_tool_output = 2000
+
+    def __init__(self):
+        self.llm_text = ""
+        self.streamed_text = ""
+        self.tool_outputs: List[Tuple[str, str]] = []
+        self.tool_call_interrupted = False
+        self.max_steps_reached = False
+
+    def text(self) -> str:
+        """Describe the partial result, or return an empty string if there is none."""
+        text = self.llm_text or self.streamed_text
+        if text:
+            return text
+        if self.tool_outputs:
+            outputs = "\n\n".join(f"{name}:\n{output}" for name, output in self.tool_outputs)
+            return f"Results of the tool calls made so far:\n\n{outputs}"
+        return ""
+
+
+def _tool_output_text(result: Any) -> str:
+    """Extract the text content of a tool call result."""
+    parts = [getattr(item, "text", None) for item in getattr(result, "content", None) or []]
+    return "\n".join(part for part in parts if part)
+
+
+def partial_result_middleware(partial: PartialResult) -> ToolCallMiddleware:
+    """Create a middleware that keeps the output of successful tool calls in ``partial``."""
+    async def middleware(server_name, name, arguments, call_next):
+        try:
+            result = await call_next(name, arguments)
+        except asyncio.CancelledError:
+            partial.tool_call_interrupted = True
+            raise
+        if not getattr(result, "isError", False):
+            partial.tool_outputs.append((name, _tool_output_text(result)[:partial.max_tool_output]))
+        return result
+    return middleware
+
+
+def partial_result_callback_handler(partial: PartialResult):
+    """Create a LangChain callback handler that keeps the latest LLM text in ``partial``."""
+    from langchain_core.callbacks import AsyncCallbackHandler
+
+    class PartialResultHandler(AsyncCallbackHandler):
+        async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+            partial.streamed_text += token or ""
+
+        async def on_llm_end(self, response, **kwargs: Any) -> None:
+            partial.streamed_text = ""
+            generations = response.generations[0] if response.generations else []
+            message = getattr(generations[0], "message", None) if generations else None
+            content = getattr(message, "content", None)
+            if isinstance(content, str) and content.strip():
+                partial.llm_text = content
+
+    return PartialResultHandler()
@@ -3,7 +3,7 @@
 GUI Application for MCP CLI.
 """
 
-import asyncio
+import concurrent.futures
 import sys
 import os
 from PyQt5.QtWidgets import (
@@ -17,29 +17,35 @@ from PyQt5.QtGui import QFont, QIcon
 
 # Import MCP CLI functions
 from mcp_cli.core import (
-    load_config, save_config, list_servers, run_query,
+    load_config, config_transaction, list_servers, run_query,
     add_server, remove_server, export_config, import_config,
-    get_server_info, list_tools, DEFAULT_MODEL
+    get_server_info, list_tools, invalidate_server_sessions, DEFAULT_MODEL
 )
+from mcp_cli.runtime import get_runtime
 
 class AsyncWorker(QThread):
-    """Worker thread to run async tasks."""
+    """Worker thread to run async tasks.
+    
+    The coroutine runs on the shared runtime loop, so MCP sessions stay warm
+    between queries; the thread only waits for its result.
+    """
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
     
     def __init__(self, coro):
         super().__init__()
         self.coro = coro
+        self.future = None
         self.running = True
     
     def run(self):
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(self.coro) if self.running else None
-            loop.close()
+            self.future = get_runtime().submit(self.coro)
+            result = self.future.result()
             if self.running:
                 self.finished.emit(result if result else "Operation completed successfully.")
+        except concurrent.futures.CancelledError:
+            pass
         except Exception as e:
             if self.running:
                 self.error.emit(str(e))
@@ -47,6 +53,8 @@ class AsyncWorker(QThread):
     def stop(self):
         """Stop the thread safely."""
         self.running = False
+        if self.future is not None:
+            self.future.cancel()
         self.wait()
 
 
@@ -345,6 +353,9 @@ class MCPCliGui(QMainWindow):
             if thread.isRunning():
                 thread.stop()
         
+        # Close pooled sessions and stop the shared event loop
+        get_runtime().shutdown()
+        
         # Accept the close event
         event.accept()
     
@@ -441,13 +452,6 @@ class MCPCliGui(QMainWindow):
         self.tools_server_combo = QComboBox()
         server_layout.addWidget(self.tools_server_combo)
         
-        # Model selection
-        server_layout.addWidget(QLabel("Model:"))
-        self.tools_model_combo = QComboBox()
-        self.tools_model_combo.addItems(["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo"])
-        self.tools_model_combo.setCurrentText(DEFAULT_MODEL)
-        server_layout.addWidget(self.tools_model_combo)
-        
         # List button
         list_button = QPushButton("List Tools")
         list_button.clicked.connect(self.list_tools_action)
@@ -509,7 +513,7 @@ class MCPCliGui(QMainWindow):
             self.tools_server_combo.clear()
             
             # Get servers from config
-            config = load_config()
+            config = load_config(readonly=True)
             servers = config.get("mcpServers", {})
             
             if not servers:
@@ -538,7 +542,7 @@ class MCPCliGui(QMainWindow):
         
         try:
             # Get server info from config
-            config = load_config()
+            config = load_config(readonly=True)
             servers = config.get("mcpServers", {})
             
             if server_name not in servers:
@@ -597,6 +601,8 @@ class MCPCliGui(QMainWindow):
         if reply == QMessageBox.Yes:
             try:
                 remove_server(server_name)
+                # Stop the removed server's pooled sessions in the background
+                get_runtime().submit(invalidate_server_sessions(server_name))
                 self.refresh_server_list()
                 self.statusBar().showMessage(f"Server '{server_name}' removed successfully")
             except Exception as e:
@@ -648,14 +654,12 @@ class MCPCliGui(QMainWindow):
             QMessageBox.warning(self, "Warning", "No server selected")
             return
         
-        model = self.tools_model_combo.currentText()
-        
         self.statusBar().showMessage(f"Listing tools for server '{server_name}'...")
         self.tools_results.clear()
         self.tools_results.setText("Retrieving tools, please wait...")
         
         # Create worker thread
-        worker = AsyncWorker(list_tools(server_name, model, return_result=True))
+        worker = AsyncWorker(list_tools(server_name, return_result=True))
         worker.finished.connect(self.handle_tools_results)
         worker.error.connect(self.handle_tools_error)
         
@@ -717,7 +721,7 @@ class MCPCliGui(QMainWindow):
         
         try:
             # Get server info from config
-            config = load_config()
+            config = load_config(readonly=True)
             servers = config.get("mcpServers", {})
             
             if server_name not in servers:
@@ -731,9 +735,15 @@ class MCPCliGui(QMainWindow):
             if dialog.exec_() == QDialog.Accepted:
                 updated_config = dialog.get_server_config()
                 
-                # Update config
-                config["mcpServers"][server_name] = updated_config
-                save_config(config)
+                # Merge into the existing entry, keeping settings the dialog
+                # doesn't show (limits, caching, recording, deadlines)
+                with config_transaction() as config:
+                    entry = config.setdefault("mcpServers", {}).setdefault(server_name, {})
+                    entry.update({key: value for key, value in updated_config.items() if value})
+                    for key in ("args", "env"):
+                        if not updated_config[key]:
+                            entry.pop(key, None)
+                get_runtime().submit(invalidate_server_sessions(server_name))
                 
                 # Refresh
                 self.refresh_server_list()
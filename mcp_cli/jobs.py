@@ -0,0 +1,280 @@
+"""
+Asynchronous query jobs for MCP CLI.
+
+A query can take dozens of agent steps, which is longer than most proxies
+keep an HTTP request open. ``JobQueue`` accepts queries, runs them on a
+fixed number of worker tasks against the pooled sessions, and keeps their
+results around so they can be fetched later by job id.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUED = 1000
+DEFAULT_MAX_RETAINED = 1000
+DEFAULT_DISK_RETENTION = 7 * 24 * 3600.0
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+@dataclass
+class Job:
+    """A query submitted for asynchronous execution.
+
+    A query on several servers has their names in ``servers``, and
+    ``server`` holds them comma-separated.
+    """
+    server: str
+    query: str
+    model: str
+    timeout: Optional[float] = None
+    max_steps: Optional[int] = None
+    servers: Optional[List[str]] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    result: Optional[str] = None
+    timed_out: bool = False
+    max_steps_reached: bool = False
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the job to a JSON-serializable dictionary."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        """Create a job from a dictionary produced by ``to_dict``."""
+        return cls(**data)
+
+
+class JobQueue:
+    """Bounded queue of query jobs executed by a fixed pool of worker tasks.
+
+    Finished jobs are kept in memory up to ``max_retained``, oldest first
+    out. If ``store_dir`` is set, finished jobs are also written there and
+    stay retrievable for ``disk_retention`` seconds after they are evicted
+    from memory.
+
+    The queue runs on the event loop it is first used from; with the API
+    server that is the shared runtime loop.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queued: int = DEFAULT_MAX_QUEUED,
+                 max_retained: int = DEFAULT_MAX_RETAINED, store_dir: Optional[str] = None,
+                 disk_retention: float = DEFAULT_DISK_RETENTION):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_retained = max_retained
+        self.store_dir = store_dir
+        self.disk_retention = disk_retention
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        # Jobs still waiting; cancelled ones stay in the queue until a
+        # worker skips them, so its size overcounts
+        self._waiting = 0
+        self._workers: List[asyncio.Task] = []
+        self._closing = False
+        self._last_prune = 0.0
+
+    def _start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._workers = [
+                asyncio.ensure_future(self._worker())
+                for _ in range(self.workers)
+            ]
+
+    async def submit(self, server: Union[str, Sequence[str]], query: str, model: str,
+                     timeout: Optional[float] = None, max_steps: Optional[int] = None) -> Job:
+        """Queue a query and return its job.
+
+        ``server`` is a server name, or several to run one agent over all of
+        them. ``timeout`` and ``max_steps`` limit the query as in
+        ``execute_query``; the timeout starts counting once a worker picks
+        the job up.
+
+        Raises:
+            JobQueueFull: If ``max_queued`` jobs are already waiting
+        """
+        self._start()
+        if self._waiting >= self.max_queued:
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+
+        servers = None if isinstance(server, str) else list(server)
+        job = Job(server=",".join(servers) if servers else server, query=query, model=model,
+                  timeout=timeout, max_steps=max_steps, servers=servers)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        self._waiting += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by id, in memory first and then on disk."""
+        job = self._jobs.get(job_id)
+        if job is None and self.store_dir:
+            job = self._load(job_id)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job.
+
+        Returns:
+            The job, or None if it does not exist.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return self.get(job_id)
+        if job.finished:
+            return job
+
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        else:
+            # Still queued; the worker skips it when it comes up
+            self._finish(job, CANCELLED)
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of jobs in each state held in memory."""
+        stats = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+        for job in self._jobs.values():
+            stats[job.status] += 1
+        return stats
+
+    async def _worker(self):
+        # Imported here to avoid a circular import with core
+        from mcp_cli.core import execute_query
+
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status != QUEUED:
+                    continue
+
+                self._waiting -= 1
+                job.status = RUNNING
+                job.started_at = time.time()
+                def on_event(event, job=job):
+                    if event.type == "result":
+                        job.timed_out = event.data.get("timed_out", False)
+                        job.max_steps_reached = event.data.get("max_steps_reached", False)
+
+                task = asyncio.ensure_future(execute_query(job.servers or job.server, job.query, job.model, emit=on_event,
+                                                           block=True, timeout=job.timeout,
+                                                           max_steps=job.max_steps))
+                self._tasks[job.id] = task
+                try:
+                    job.result = await task
+                    self._finish(job, SUCCEEDED)
+                except asyncio.CancelledError:
+                    self._finish(job, CANCELLED)
+                    if self._closing:
+                        raise
+                except Exception as e:
+                    job.error = str(e)
+                    self._finish(job, FAILED)
+                finally:
+                    self._tasks.pop(job.id, None)
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, job: Job, status: str):
+        if job.status == QUEUED:
+            self._waiting -= 1
+        job.status = status
+        job.finished_at = time.time()
+        if self.store_dir:
+            try:
+                self._store(job)
+            except OSError as e:
+                logger.warning(f"Failed to store job {job.id}: {e}")
+        self._evict()
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond ``max_retained``."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_retained, 0)]:
+            del self._jobs[job_id]
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.store_dir, f"{job_id}.json")
+
+    def _store(self, job: Job):
+        os.makedirs(self.store_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(job.to_dict(), f)
+            os.replace(tmp_path, self._path(job.id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._prune_store()
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        # Job ids are hex strings; anything else can't name a stored job
+        if not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        try:
+            with open(self._path(job_id), "r") as f:
+                return Job.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _prune_store(self):
+        """Delete stored jobs older than ``disk_retention``, at most once a minute."""
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        cutoff = now - self.disk_retention
+        for entry in os.scandir(self.store_dir):
+            try:
+                if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+    async def close(self):
+        """Cancel running jobs and stop the workers."""
+        self._closing = True
+        for task in list(self._tasks.values()):
+            task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._waiting = 0
+        self._closing = False
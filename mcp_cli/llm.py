@@ -0,0 +1,289 @@
+"""
+Shared LLM clients for MCP CLI.
+
+Creating a ``ChatOpenAI`` per query also creates a new HTTP client, so
+every query pays for connection and TLS setup to the model endpoint.
+``LLMRegistry`` keeps one client per model and settings, all sharing a
+single tuned HTTP connection pool, so keep-alive connections are reused
+across queries.
+
+Models are created by providers, chosen by a prefix of the model name:
+
+- ``openai:gpt-4o`` (or just ``gpt-4o``) uses the OpenAI API
+- ``local:llama3`` uses an OpenAI-compatible server such as Ollama or
+  vLLM, at the ``localBaseUrl`` setting
+- ``replay:<recording>`` answers from a recording made with the
+  ``record`` setting; see ``mcp_cli.llm_replay``
+
+Further providers can be added with ``register_provider``.
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_LOCAL_BASE_URL = "http://localhost:11434/v1"
+
+
+@dataclass
+class LLMProvider:
+    """Creates chat models for the model names with one prefix.
+
+    Attributes:
+        name: Prefix selecting the provider, as in ``name:model``
+        create: Function called with the registry, the model name without
+            the prefix and further model options, returning a chat model
+        needs_openai_key: Whether queries need ``OPENAI_API_KEY``
+    """
+    name: str
+    create: Callable[["LLMRegistry", str, Dict[str, Any]], "BaseChatModel"]
+    needs_openai_key: bool = False
+
+
+_providers: Dict[str, LLMProvider] = {}
+
+
+def register_provider(name: str, create: Callable[["LLMRegistry", str, Dict[str, Any]], "BaseChatModel"],
+                      needs_openai_key: bool = False):
+    """Make model names starting with ``name:`` use ``create``."""
+    _providers[name] = LLMProvider(name, create, needs_openai_key)
+
+
+def resolve_model(model: str) -> Tuple[LLMProvider, str]:
+    """Split a model name into its provider and the provider's model name.
+
+    Names without a known prefix, such as ``gpt-4o`` or OpenAI fine-tune
+    ids like ``ft:gpt-4o-mini:org::id``, use the OpenAI provider.
+    """
+    prefix, separator, name = model.partition(":")
+    if separator and prefix in _providers:
+        return _providers[prefix], name
+    return _providers["openai"], model
+
+
+def needs_openai_key(model: str) -> bool:
+    """Whether running a model requires ``OPENAI_API_KEY`` to be set."""
+    return resolve_model(model)[0].needs_openai_key
+
+
+def recording_path(name: str) -> str:
+    """Resolve a recording name to its file.
+
+    A bare name refers to ``recordings/llm/<name>.jsonl`` under the config
+    directory; anything that looks like a path is used as is.
+    """
+    if os.sep in name or "/" in name or name.endswith(".jsonl"):
+        return os.path.abspath(os.path.expanduser(name))
+    # Imported here since core imports this module
+    from mcp_cli.core import get_config_dir
+
+    return os.path.join(get_config_dir(), "recordings", "llm", f"{name}.jsonl")
+
+
+def _create_openai(registry: "LLMRegistry", model: str, options: Dict[str, Any]) -> "BaseChatModel":
+    # Imported here so that config-only commands don't load langchain
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=model,
+        timeout=registry.settings.get("timeout", DEFAULT_TIMEOUT),
+        max_retries=registry.settings.get("maxRetries", DEFAULT_MAX_RETRIES),
+        http_async_client=registry.http_client(),
+        **options
+    )
+
+
+def _create_local(registry: "LLMRegistry", model: str, options: Dict[str, Any]) -> "BaseChatModel":
+    options = dict(options)
+    options.setdefault("base_url", registry.settings.get("localBaseUrl", DEFAULT_LOCAL_BASE_URL))
+    # Local servers usually ignore the key, but the client requires one
+    options.setdefault("api_key", registry.settings.get("localApiKey", "local"))
+    return _create_openai(registry, model, options)
+
+
+def _create_replay(registry: "LLMRegistry", model: str, options: Dict[str, Any]) -> "BaseChatModel":
+    from mcp_cli.llm_replay import ReplayChatModel
+
+    return ReplayChatModel(
+        recording_path=recording_path(model),
+        latency=registry.settings.get("replayLatency"),
+        speed=registry.settings.get("replaySpeed", 1.0),
+        **options
+    )
+
+
+register_provider("openai", _create_openai, needs_openai_key=True)
+register_provider("local", _create_local)
+register_provider("replay", _create_replay)
+
+
+class LLMRegistry:
+    """Process-wide LLM clients keyed by model and options.
+
+    Settings (all optional) come from the ``llm`` section of the config
+    file: ``timeout`` and ``connectTimeout`` in seconds, ``maxConnections``,
+    ``maxKeepalive``, ``keepaliveExpiry`` and ``maxRetries``;
+    ``localBaseUrl`` and ``localApiKey`` for ``local:`` models;
+    ``replayLatency`` and ``replaySpeed`` for ``replay:`` models; and
+    ``record``, the name or path of a recording to append every call of
+    the other models to.
+
+    The HTTP pool is asynchronous and bound to the event loop it is used
+    from; use ``get_llm_registry()`` to obtain the registry for the running
+    loop.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(settings or {})
+        self._clients: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], "BaseChatModel"] = {}
+        self._registered: Dict[str, Any] = {}
+        self._http_client = None
+        self._retired_http_clients: List[Any] = []
+
+    def configure(self, settings: Optional[Dict[str, Any]]):
+        """Apply new settings if they differ from the current ones.
+
+        Clients are then created afresh, on a new HTTP connection pool. The
+        old pool is only closed with the registry, since queries still
+        running may be using it. Models added with ``register()`` are kept.
+        """
+        settings = dict(settings or {})
+        if settings == self.settings:
+            return
+        self.settings = settings
+        self._clients = {(model, ()): llm for model, llm in self._registered.items()}
+        if self._http_client is not None:
+            self._retired_http_clients.append(self._http_client)
+            self._http_client = None
+
+    def http_client(self):
+        """The shared ``httpx.AsyncClient``, created on first use."""
+        if self._http_client is None:
+            # httpx is installed with the openai client library
+            import httpx
+
+            settings = self.settings
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    settings.get("timeout", DEFAULT_TIMEOUT),
+                    connect=settings.get("connectTimeout", DEFAULT_CONNECT_TIMEOUT)
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.get("maxConnections", DEFAULT_MAX_CONNECTIONS),
+                    max_keepalive_connections=settings.get("maxKeepalive", DEFAULT_MAX_KEEPALIVE),
+                    keepalive_expiry=settings.get("keepaliveExpiry", DEFAULT_KEEPALIVE_EXPIRY)
+                )
+            )
+        return self._http_client
+
+    def get(self, model: str, **options: Any) -> "BaseChatModel":
+        """Get the shared client for a model, creating it if needed.
+
+        Args:
+            model: Model name, optionally with a provider prefix
+            **options: Further arguments for the provider's chat model, part of the key
+        """
+        key = (model, tuple(sorted(options.items())))
+        llm = self._clients.get(key)
+        if llm is None:
+            provider, name = resolve_model(model)
+            llm = provider.create(self, name, options)
+            self._clients[key] = llm
+        return llm
+
+    def recorder(self, model: str):
+        """Get a callback handler recording the calls of a model, or None.
+
+        Calls are only recorded if the ``record`` setting is set, and never
+        for models that are themselves replayed.
+        """
+        record = self.settings.get("record")
+        if not record or resolve_model(model)[0].name == "replay":
+            return None
+        from mcp_cli.llm_replay import LLMRecorder
+
+        return LLMRecorder(recording_path(record), model)
+
+    def register(self, model: str, llm: Any):
+        """Serve a model name with a prebuilt chat model.
+
+        Queries naming ``model`` then use ``llm`` instead of an OpenAI
+        client; the benchmarks use this to run against a scripted model.
+        """
+        self._registered[model] = llm
+        self._clients[(model, ())] = llm
+
+    def for_request(self, model: str, callbacks: Optional[List[Any]] = None,
+                    streaming: bool = False) -> "BaseChatModel":
+        """Get a client for one request, with its own callbacks.
+
+        Callbacks are per request, so they can't be set on a shared client.
+        A shallow copy is returned instead, which keeps using the shared
+        OpenAI client and its connection pool. If recording is enabled, the
+        recorder is added to the callbacks.
+        """
+        llm = self.get(model)
+        recorder = self.recorder(model)
+        if recorder is not None:
+            callbacks = list(callbacks or []) + [recorder]
+        if not callbacks and not streaming:
+            return llm
+        # Older langchain-openai releases are pydantic v1 models
+        copy = getattr(llm, "model_copy", None) or llm.copy
+        return copy(update={"callbacks": callbacks, "streaming": streaming})
+
+    async def close(self):
+        """Close the shared HTTP connection pool, and those replaced by ``configure()``."""
+        self._clients.clear()
+        self._registered.clear()
+        http_clients = self._retired_http_clients + ([self._http_client] if self._http_client is not None else [])
+        self._retired_http_clients = []
+        self._http_client = None
+        for http_client in http_clients:
+            try:
+                await http_client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing LLM HTTP client: {e}")
+
+
+_registries: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LLMRegistry]" = weakref.WeakKeyDictionary()
+
+
+def get_llm_registry(settings: Optional[Dict[str, Any]] = None) -> LLMRegistry:
+    """Get the LLM registry for the running event loop, creating it if needed.
+
+    Args:
+        settings: The ``llm`` section of the config file, applied to the
+            registry if it changed since the last call; None keeps the
+            registry's current settings
+    """
+    loop = asyncio.get_running_loop()
+    registry = _registries.get(loop)
+    if registry is None:
+        registry = LLMRegistry(settings)
+        _registries[loop] = registry
+    elif settings is not None:
+        registry.configure(settings)
+    return registry
+
+
+async def close_llm_registry():
+    """Close the LLM registry for the running event loop, if any."""
+    loop = asyncio.get_running_loop()
+    registry = _registries.pop(loop, None)
+    if registry is not None:
+        await registry.close()
@@ -0,0 +1,225 @@
+"""
+Recording and replay of LLM calls for MCP CLI.
+
+``LLMRecorder`` is a LangChain callback handler that appends every chat
+model call (the messages sent and the reply received) to a JSON Lines
+file. ``ReplayChatModel`` serves those replies back without a network
+connection, optionally taking as long as the recorded calls did, so the
+CLI, API and agent loop can be profiled on their own and benchmarks can
+run offline.
+
+Each line of a recording holds one call::
+
+    {"key": "...", "step_key": "...", "model": "gpt-4o", "duration": 1.42,
+     "messages": [...], "response": {"content": "...", "tool_calls": [...]}}
+
+Replies are looked up by a hash of the whole conversation so far. If the
+conversation differs from the recorded one (for example because a tool
+returned different data), the reply recorded for the same query at the
+same agent step is used instead.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+RECORDED_LATENCY = "recorded"
+
+
+def _describe(message: BaseMessage) -> Dict[str, Any]:
+    """The parts of a message that identify a conversation, without per-run ids."""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+    description: Dict[str, Any] = {"type": message.type, "content": content}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        description["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in tool_calls]
+    return description
+
+
+def _hash(data: Any) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def request_key(messages: Sequence[BaseMessage]) -> str:
+    """Key a chat model call by its whole conversation."""
+    return _hash([_describe(message) for message in messages])
+
+
+def step_key(messages: Sequence[BaseMessage]) -> str:
+    """Key a chat model call by its first user message and agent step."""
+    query = next((message.content for message in messages if isinstance(message, HumanMessage)), "")
+    steps = sum(1 for message in messages if isinstance(message, AIMessage))
+    return _hash([query, steps])
+
+
+def _response_to_dict(message: BaseMessage) -> Dict[str, Any]:
+    response: Dict[str, Any] = {"content": message.content}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        response["tool_calls"] = [
+            {"name": call["name"], "args": call["args"], "id": call.get("id")} for call in tool_calls
+        ]
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        response["usage_metadata"] = dict(usage)
+    return response
+
+
+def _response_from_dict(data: Dict[str, Any]) -> AIMessage:
+    tool_calls = [
+        {"name": call["name"], "args": call.get("args") or {}, "id": call.get("id") or f"call_{i}"}
+        for i, call in enumerate(data.get("tool_calls") or [])
+    ]
+    return AIMessage(content=data.get("content") or "", tool_calls=tool_calls,
+                     usage_metadata=data.get("usage_metadata"))
+
+
+class LLMRecorder(AsyncCallbackHandler):
+    """Callback handler appending each chat model call to a recording.
+
+    Args:
+        path: JSON Lines file to append to; its directory is created if needed
+        model: Model name stored with each call
+    """
+
+    def __init__(self, path: str, model: str = ""):
+        self.path = path
+        self.model = model
+        self._started: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs: Any) -> None:
+        self._started[run_id] = (messages[0] if messages else [], time.monotonic())
+
+    async def on_llm_end(self, response, *, run_id, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is None or not response.generations or not response.generations[0]:
+            return
+        messages, start = started
+        reply = getattr(response.generations[0][0], "message", None)
+        if reply is None:
+            return
+        entry = {
+            "key": request_key(messages),
+            "step_key": step_key(messages),
+            "model": self.model,
+            "duration": time.monotonic() - start,
+            "messages": [_describe(message) for message in messages],
+            "response": _response_to_dict(reply)
+        }
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    async def on_llm_error(self, error, *, run_id, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+
+
+class Recording:
+    """Recorded chat model calls loaded from a JSON Lines file.
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If a line is not valid JSON
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.by_key: Dict[str, Dict[str, Any]] = {}
+        self.by_step: Dict[str, Dict[str, Any]] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}, line {number}: invalid JSON: {e}")
+                # The first recording of a call wins, so replay follows the first run
+                self.by_key.setdefault(entry.get("key"), entry)
+                self.by_step.setdefault(entry.get("step_key"), entry)
+
+    def find(self, messages: Sequence[BaseMessage]) -> Optional[Dict[str, Any]]:
+        """Find the recorded call for a conversation, or None."""
+        return self.by_key.get(request_key(messages)) or self.by_step.get(step_key(messages))
+
+
+_recordings: Dict[str, Tuple[float, Recording]] = {}
+_recordings_lock = threading.Lock()
+
+
+def load_recording(path: str) -> Recording:
+    """Load a recording, sharing it between models replaying the same file.
+
+    The file is read again once it has been modified.
+    """
+    mtime = os.path.getmtime(path)
+    with _recordings_lock:
+        cached = _recordings.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _recordings[path] = (mtime, Recording(path))
+        return cached[1]
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model answering from a recording instead of a model endpoint.
+
+    Attributes:
+        recording_path: Recording to replay
+        latency: ``"recorded"`` to take as long as each recorded call did,
+            a number of seconds to wait per call, or None not to wait
+        speed: Factor dividing recorded durations, e.g. 2 to replay twice
+            as fast
+    """
+
+    recording_path: str
+    latency: Optional[Union[str, float]] = None
+    speed: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ReplayChatModel":
+        # Replies come from the recording, which already holds the tool calls
+        return self
+
+    def _reply(self, messages: List[BaseMessage]):
+        try:
+            recording = load_recording(self.recording_path)
+        except OSError as e:
+            raise ValueError(f"Can't read LLM recording {self.recording_path}: {e}")
+        entry = recording.find(messages)
+        if entry is None:
+            raise ValueError(f"No recorded LLM response in {self.recording_path} matches this conversation")
+        if self.latency == RECORDED_LATENCY:
+            delay = float(entry.get("duration") or 0.0) / (self.speed or 1.0)
+        else:
+            delay = float(self.latency or 0.0)
+        return ChatResult(generations=[ChatGeneration(message=_response_from_dict(entry["response"]))]), delay
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        result, delay = self._reply(messages)
+        if delay:
+            time.sleep(delay)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        result, delay = self._reply(messages)
+        if delay:
+            await asyncio.sleep(delay)
+        return result
@@ -0,0 +1,269 @@
+"""
+Load generation against the MCP CLI API server.
+
+``run_load`` drives a running ``mcp-server`` with one of several request
+scenarios, and ``LoadReport`` summarizes the outcome: throughput, latency
+percentiles, errors and a latency histogram.
+
+Two arrival models are supported. In a closed loop, a fixed number of
+clients each send their next request as soon as the previous one
+completes, so the request rate adapts to the server. In an open loop,
+requests arrive at a fixed average rate whether or not earlier ones have
+completed, as independent users would; latency is measured from each
+request's scheduled arrival, so time spent waiting behind a slow server
+is not hidden.
+"""
+
+import asyncio
+import math
+import random
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from mcp_cli.metrics import DEFAULT_BUCKETS
+
+SCENARIOS = ("query", "tools", "servers")
+ARRIVAL_MODELS = ("closed", "open")
+
+DEFAULT_URL = "http://localhost:5000"
+DEFAULT_BENCH_CONCURRENCY = 10
+DEFAULT_BENCH_DURATION = "60s"
+DEFAULT_REQUEST_TIMEOUT = 300.0
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration such as ``60s``, ``500ms``, ``2m`` or ``90`` into seconds.
+
+    Raises:
+        ValueError: If the value is not a positive duration
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*", value)
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f"Invalid duration '{value}'; use e.g. 60s, 500ms, 2m")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2) or "s"]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+class LoadReport:
+    """Outcome of a load run.
+
+    Latencies are kept for successful requests only; failed requests are
+    counted by reason, such as ``HTTP 429`` or ``timeout``.
+    """
+
+    def __init__(self, scenario: str, arrival: str, concurrency: int, rate: Optional[float] = None):
+        self.scenario = scenario
+        self.arrival = arrival
+        self.concurrency = concurrency
+        self.rate = rate
+        self.latencies: List[float] = []
+        self.errors: Counter = Counter()
+        self.elapsed = 0.0
+
+    def record(self, latency: float, error: Optional[str] = None):
+        if error is None:
+            self.latencies.append(latency)
+        else:
+            self.errors[error] += 1
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+    def histogram(self) -> List[Tuple[float, int]]:
+        """Count successful requests per latency bucket, as ``(upper bound, count)`` pairs.
+
+        The buckets are the ones used by the API server's metrics, ending
+        with an unbounded ``inf`` bucket.
+        """
+        bounds = list(DEFAULT_BUCKETS) + [float("inf")]
+        counts = [0] * len(bounds)
+        for latency in self.latencies:
+            for i, bound in enumerate(bounds):
+                if latency <= bound:
+                    counts[i] += 1
+                    break
+        return list(zip(bounds, counts))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the report to a JSON-serializable dictionary."""
+        latencies = sorted(self.latencies)
+        return {
+            "scenario": self.scenario,
+            "arrival": self.arrival,
+            "concurrency": self.concurrency,
+            "rate": self.rate,
+            "duration": self.elapsed,
+            "requests": self.requests,
+            "succeeded": len(latencies),
+            "failed": sum(self.errors.values()),
+            "throughput": self.requests / self.elapsed if self.elapsed else 0.0,
+            "success_throughput": len(latencies) / self.elapsed if self.elapsed else 0.0,
+            "latency": {
+                "min": latencies[0] if latencies else 0.0,
+                "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50": percentile(latencies, 0.50),
+                "p90": percentile(latencies, 0.90),
+                "p99": percentile(latencies, 0.99),
+                "max": latencies[-1] if latencies else 0.0
+            },
+            "errors": dict(self.errors.most_common()),
+            "histogram": [{"le": "+Inf" if bound == float("inf") else bound, "count": count}
+                          for bound, count in self.histogram()]
+        }
+
+
+def build_request(scenario: str, server: Optional[str] = None, query: Optional[str] = None,
+                  model: Optional[str] = None, use_cache: bool = True) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    """Get the method, path and JSON body of a scenario's request.
+
+    Raises:
+        ValueError: If the scenario is unknown or lacks a server or query
+    """
+    if scenario == "servers":
+        return "GET", "/api/servers", None
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario '{scenario}'; choose from {', '.join(SCENARIOS)}")
+    if not server:
+        raise ValueError(f"The '{scenario}' scenario needs a server name")
+    if scenario == "tools":
+        return "GET", f"/api/servers/{server}/tools" + ("" if use_cache else "?refresh=true"), None
+    if not query:
+        raise ValueError("The 'query' scenario needs a query")
+    body: Dict[str, Any] = {"server": server, "query": query, "cache": use_cache}
+    if model:
+        body["model"] = model
+    return "POST", "/api/query", body
+
+
+async def run_load(url: str, scenario: str, duration: float, concurrency: int = DEFAULT_BENCH_CONCURRENCY,
+                   arrival: str = "closed", rate: Optional[float] = None, server: Optional[str] = None,
+                   query: Optional[str] = None, model: Optional[str] = None, use_cache: bool = True,
+                   timeout: float = DEFAULT_REQUEST_TIMEOUT) -> LoadReport:
+    """Send requests to the API server for ``duration`` seconds.
+
+    New requests stop once the duration is over; requests still in flight
+    are waited for and included in the report.
+
+    Args:
+        url: Base URL of the API server
+        scenario: ``query`` (``POST /api/query``), ``tools``
+            (``GET /api/servers/<server>/tools``) or ``servers``
+            (``GET /api/servers``)
+        duration: Seconds to send requests for
+        concurrency: Clients in a closed loop, or the maximum number of
+            requests in flight in an open loop
+        arrival: ``closed`` or ``open``
+        rate: Average requests per second in an open loop; arrivals are
+            spaced randomly (Poisson arrivals)
+        server: Server to query or list the tools of
+        query: Query for the ``query`` scenario
+        model: OpenAI model for the ``query`` scenario, or None for the server default
+        use_cache: If False, bypass the query result cache or the tool cache
+        timeout: Seconds before a request counts as timed out
+
+    Raises:
+        ValueError: If the arguments don't describe a valid run
+    """
+    method, path, body = build_request(scenario, server, query, model, use_cache)
+    if arrival not in ARRIVAL_MODELS:
+        raise ValueError(f"Unknown arrival model '{arrival}'; choose from {', '.join(ARRIVAL_MODELS)}")
+    if arrival == "open" and not rate:
+        raise ValueError("An open loop needs a request rate")
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
+
+    # aiohttp is only needed for load runs
+    import aiohttp
+
+    report = LoadReport(scenario, arrival, concurrency, rate if arrival == "open" else None)
+    target = url.rstrip("/") + path
+
+    async def send(session, scheduled: float):
+        error = None
+        try:
+            async with session.request(method, target, json=body) as response:
+                await response.read()
+                if response.status >= 400:
+                    error = f"HTTP {response.status}"
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except aiohttp.ClientError as e:
+            error = type(e).__name__
+        report.record(time.monotonic() - scheduled, error)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        start = time.monotonic()
+        deadline = start + duration
+
+        if arrival == "closed":
+            async def client():
+                while time.monotonic() < deadline:
+                    await send(session, time.monotonic())
+
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+        else:
+            # Requests beyond the connection limit wait for a connection;
+            # that wait counts towards their latency
+            tasks = []
+            scheduled = start
+            while True:
+                scheduled += random.expovariate(rate)
+                if scheduled >= deadline:
+                    break
+                await asyncio.sleep(max(0.0, scheduled - time.monotonic()))
+                tasks.append(asyncio.ensure_future(send(session, scheduled)))
+            await asyncio.gather(*tasks)
+
+        report.elapsed = time.monotonic() - start
+    return report
+
+
+def format_report(report: LoadReport, url: str, width: int = 40) -> str:
+    """Format a load report as text for the terminal."""
+    data = report.to_dict()
+    latency = data["latency"]
+
+    def ms(seconds: float) -> str:
+        return f"{seconds * 1000:.1f}ms"
+
+    if report.arrival == "open":
+        model = f"open loop, {report.rate:g} req/s, up to {report.concurrency} in flight"
+    else:
+        model = f"closed loop, {report.concurrency} clients"
+    lines = [
+        f"Scenario: {report.scenario} ({model}) against {url}",
+        f"Duration:   {data['duration']:.1f}s",
+        f"Requests:   {data['requests']} ({data['succeeded']} succeeded, {data['failed']} failed)",
+        f"Throughput: {data['throughput']:.1f} req/s ({data['success_throughput']:.1f} succeeded/s)",
+        f"Latency:    min {ms(latency['min'])}  mean {ms(latency['mean'])}  p50 {ms(latency['p50'])}  "
+        f"p90 {ms(latency['p90'])}  p99 {ms(latency['p99'])}  max {ms(latency['max'])}"
+    ]
+
+    if data["errors"]:
+        lines.append("Errors:")
+        for error, count in data["errors"].items():
+            lines.append(f"  {error:<24} {count}")
+
+    histogram = report.histogram()
+    used = [i for i, (_, count) in enumerate(histogram) if count]
+    if used:
+        lines.append("Latency histogram:")
+        peak = max(count for _, count in histogram)
+        for bound, count in histogram[used[0]:used[-1] + 1]:
+            label = "> " + ms(DEFAULT_BUCKETS[-1]) if bound == float("inf") else "<= " + ms(bound)
+            bar = "#" * int(round(count / peak * width))
+            lines.append(f"  {label:>11} |{bar:<{width}}| {count}")
+    return "\n".join(lines)
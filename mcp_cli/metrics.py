@@ -0,0 +1,263 @@
+"""
+Timing and metrics for MCP CLI.
+
+Each query records how long it spends in every phase (waiting for
+admission, starting or leasing sessions, LLM calls, tool calls, releasing
+sessions) in a ``Timings`` object, which is returned with its result.
+The same measurements are aggregated per server and model into counters
+and histograms that the API server exposes in the Prometheus text format.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from mcp_cli.events import ToolCallMiddleware
+
+# Histogram buckets in seconds, from fast cache hits to long agent runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Query phases
+PHASE_CACHE = "cache"
+PHASE_QUEUE = "queue"
+PHASE_SESSION = "session"
+PHASE_AGENT = "agent"
+PHASE_LLM = "llm"
+PHASE_TOOLS = "tools"
+PHASE_RELEASE = "release"
+
+
+class Timings:
+    """Time spent in each phase of one query.
+
+    Phases that happen several times, such as LLM and tool calls, are
+    summed, and the number of times is kept as well.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def add(self, phase: str, duration: float):
+        """Record ``duration`` seconds spent in ``phase``."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    @contextmanager
+    def phase(self, phase: str):
+        """Record the time spent in a ``with`` block as ``phase``."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(phase, time.monotonic() - start)
+
+    def finish(self):
+        """Stop the clock for the query as a whole."""
+        if self.finished is None:
+            self.finished = time.monotonic()
+
+    @property
+    def total(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the timings to a JSON-serializable dictionary."""
+        return {
+            "total": self.total,
+            "phases": dict(self.phases),
+            "calls": {phase: self.calls[phase] for phase in (PHASE_LLM, PHASE_TOOLS) if phase in self.calls}
+        }
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_value(list(zip(self.labelnames, key)), value))
+        return lines
+
+    def _render_value(self, labels, value) -> List[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """A value that only goes up, such as a number of queries."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value sampled at a point in time, such as a queue depth."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def _render_value(self, labels, value) -> List[str]:
+        lines = []
+        for bound, count in zip(self.buckets, value["buckets"]):
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(float(bound)))])} {count}")
+        lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {value['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {value['count']}")
+        return lines
+
+
+QUERIES = Counter("mcp_queries_total", "Queries run, by outcome.", ["server", "model", "status"])
+QUERY_DURATION = Histogram("mcp_query_duration_seconds", "Time to answer a query.", ["server", "model"])
+QUERY_PHASE_DURATION = Histogram("mcp_query_phase_duration_seconds", "Time a query spent in each phase.",
+                                 ["server", "model", "phase"])
+LLM_CALL_DURATION = Histogram("mcp_llm_call_duration_seconds", "Duration of individual LLM calls.", ["model"])
+TOOL_CALLS = Counter("mcp_tool_calls_total", "Tool calls, by outcome.", ["server", "tool", "status"])
+TOOL_CALL_DURATION = Histogram("mcp_tool_call_duration_seconds", "Duration of tool calls.", ["server", "tool"])
+SESSION_START_DURATION = Histogram("mcp_session_start_seconds",
+                                   "Time to start an MCP server and initialize its session.", ["server"])
+SESSION_CLOSE_DURATION = Histogram("mcp_session_close_seconds", "Time to close an MCP session.", ["server"])
+SESSIONS = Gauge("mcp_sessions", "Pooled MCP sessions, by state.", ["server", "state"])
+QUERIES_ACTIVE = Gauge("mcp_queries_active", "Queries currently running against a server.", ["server"])
+QUERIES_QUEUED = Gauge("mcp_queries_queued", "Queries waiting for a server's concurrency limit.", ["server"])
+JOBS = Gauge("mcp_jobs", "Asynchronous jobs held in memory, by status.", ["status"])
+
+ALL_METRICS: List[_Metric] = [
+    QUERIES, QUERY_DURATION, QUERY_PHASE_DURATION, LLM_CALL_DURATION, TOOL_CALLS, TOOL_CALL_DURATION,
+    SESSION_START_DURATION, SESSION_CLOSE_DURATION, SESSIONS, QUERIES_ACTIVE, QUERIES_QUEUED, JOBS
+]
+
+
+def record_query(server: str, model: str, status: str, timings: Timings):
+    """Aggregate a finished query into the query metrics."""
+    QUERIES.inc(server=server, model=model, status=status)
+    QUERY_DURATION.observe(timings.total, server=server, model=model)
+    for phase, duration in timings.phases.items():
+        QUERY_PHASE_DURATION.observe(duration, server=server, model=model, phase=phase)
+
+
+def update_pool_gauges(pool_stats: Dict[str, Dict[str, int]]):
+    """Set the session and queue gauges from ``SessionPool.stats()``."""
+    for gauge in (SESSIONS, QUERIES_ACTIVE, QUERIES_QUEUED):
+        gauge.clear()
+    for server, stats in pool_stats.items():
+        SESSIONS.set(stats.get("idle", 0), server=server, state="idle")
+        SESSIONS.set(stats.get("in_use", 0), server=server, state="in_use")
+        QUERIES_ACTIVE.set(stats.get("active", 0), server=server)
+        QUERIES_QUEUED.set(stats.get("queued", 0), server=server)
+
+
+def render() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def tool_timing_middleware(timings: Timings) -> ToolCallMiddleware:
+    """Create a middleware that times tool calls into ``timings`` and the tool metrics."""
+    async def middleware(server_name, name, arguments, call_next):
+        start = time.monotonic()
+        status = "error"
+        try:
+            result = await call_next(name, arguments)
+            status = "error" if getattr(result, "isError", False) else "success"
+            return result
+        finally:
+            duration = time.monotonic() - start
+            timings.add(PHASE_TOOLS, duration)
+            TOOL_CALLS.inc(server=server_name, tool=name, status=status)
+            TOOL_CALL_DURATION.observe(duration, server=server_name, tool=name)
+    return middleware
+
+
+def llm_timing_callback_handler(timings: Timings, model: str):
+    """Create a LangChain callback handler that times LLM calls into ``timings``."""
+    # Imported here since langchain is only needed once an agent runs
+    from langchain_core.callbacks import AsyncCallbackHandler
+
+    class TimingHandler(AsyncCallbackHandler):
+        def __init__(self):
+            self.started: Dict[Any, float] = {}
+
+        async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs: Any) -> None:
+            self.started[run_id] = time.monotonic()
+
+        async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs: Any) -> None:
+            self.started[run_id] = time.monotonic()
+
+        def _finish(self, run_id):
+            start = self.started.pop(run_id, None)
+            if start is not None:
+                duration = time.monotonic() - start
+                timings.add(PHASE_LLM, duration)
+                LLM_CALL_DURATION.observe(duration, model=model)
+
+        async def on_llm_end(self, response, *, run_id, **kwargs: Any) -> None:
+            self._finish(run_id)
+
+        async def on_llm_error(self, error, *, run_id, **kwargs: Any) -> None:
+            self._finish(run_id)
+
+    return TimingHandler()
@@ -0,0 +1,662 @@
+"""
+Session pooling for MCP servers.
+
+Starting an MCP server (usually through ``npx``) and running the MCP
+handshake is the most expensive part of a query. The pool keeps initialized
+clients alive between calls so that ``run_query`` and ``list_tools`` can
+reuse warm sessions instead of spawning a new subprocess every time.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import time
+import weakref
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from mcp_cli import metrics
+from mcp_cli.transport import client_config
+
+if TYPE_CHECKING:
+    from mcp_use import MCPClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS_PER_SERVER = 4
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_REAP_INTERVAL = 60.0
+
+# JSON-RPC error code of requests failed by a closed MCP connection
+CONNECTION_CLOSED = -32000
+
+# Keys in a server's configuration that tune MCP CLI itself rather than
+# describe how to start the server. They are not passed to the MCP client
+# and don't affect the server's fingerprint.
+SERVER_SETTINGS_KEYS = {"maxConcurrency", "maxQueued", "cacheableTools", "toolCacheTtl", "queryTimeout", "maxSteps"}
+
+
+def launch_config(server_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the part of a server configuration that describes how to start it."""
+    return {key: value for key, value in server_config.items() if key not in SERVER_SETTINGS_KEYS}
+
+
+def server_fingerprint(server_config: Dict[str, Any]) -> str:
+    """Return a stable hash of a server configuration.
+
+    Two configurations with the same command, arguments and environment
+    produce the same fingerprint, so editing a server invalidates anything
+    that was keyed by the old configuration.
+    """
+    payload = json.dumps(launch_config(server_config), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def validate_server_limits(server_name: str, server_config: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+    """Check a server's ``maxConcurrency`` and ``maxQueued`` settings.
+
+    Returns:
+        ``(max_concurrency, max_queued)``, each None if not set
+
+    Raises:
+        ValueError: If ``maxConcurrency`` is not a positive integer or
+            ``maxQueued`` not a non-negative one
+    """
+    limits = []
+    for key, minimum in (("maxConcurrency", 1), ("maxQueued", 0)):
+        value = server_config.get(key)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < minimum):
+            kind = "a positive" if minimum else "a non-negative"
+            raise ValueError(f"Server '{server_name}': {key} must be {kind} integer, not {value!r}")
+        limits.append(value)
+    return limits[0], limits[1]
+
+
+def validate_pool_settings(settings: Dict[str, Any]) -> Tuple[int, Optional[float]]:
+    """Check the ``sessionPool`` settings of the config file.
+
+    ``maxSessionsPerServer`` (default: 4) is the number of sessions started
+    per server when it sets no ``maxConcurrency``, and ``idleTimeout``
+    (default: 300) the seconds an idle session is kept, or null to keep it
+    until the pool closes.
+
+    Returns:
+        ``(max_sessions_per_server, idle_timeout)``
+
+    Raises:
+        ValueError: If ``maxSessionsPerServer`` is not a positive integer or
+            ``idleTimeout`` not a positive, finite number or null
+    """
+    max_sessions = settings.get("maxSessionsPerServer", DEFAULT_MAX_SESSIONS_PER_SERVER)
+    if isinstance(max_sessions, bool) or not isinstance(max_sessions, int) or max_sessions < 1:
+        raise ValueError(f"sessionPool: maxSessionsPerServer must be a positive integer, not {max_sessions!r}")
+    idle_timeout = settings.get("idleTimeout", DEFAULT_IDLE_TIMEOUT)
+    if idle_timeout is not None and (isinstance(idle_timeout, bool) or not isinstance(idle_timeout, (int, float))
+                                     or not math.isfinite(idle_timeout) or idle_timeout <= 0):
+        raise ValueError(f"sessionPool: idleTimeout must be a positive number of seconds or null, not {idle_timeout!r}")
+    return max_sessions, idle_timeout
+
+
+def session_broken(error: BaseException) -> bool:
+    """Whether an error raised while a session was leased may have broken it.
+
+    Transport failures and cancellation (which can abandon a request in
+    flight) leave the session unusable; other errors, such as the LLM
+    failing, don't concern the session.
+    """
+    if isinstance(error, (asyncio.CancelledError, asyncio.TimeoutError, OSError, EOFError)):
+        return True
+    if getattr(getattr(error, "error", None), "code", None) == CONNECTION_CLOSED:
+        return True
+    try:
+        # anyio comes with the MCP SDK; imported here to keep the pool light
+        import anyio
+    except ImportError:
+        return False
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream))
+
+
+class ServerBusy(Exception):
+    """Raised when a server's concurrency limit and queue are both full."""
+
+    def __init__(self, server_name: str, retry_after: int):
+        super().__init__(f"Server '{server_name}' is busy; retry in {retry_after}s")
+        self.server_name = server_name
+        self.retry_after = retry_after
+
+
+class ServerLimiter:
+    """Admission control for agent runs against one server.
+
+    At most ``max_concurrency`` runs proceed at once. Further runs wait in
+    FIFO order; once ``max_queued`` runs are waiting, new ones are rejected
+    immediately with ``ServerBusy`` instead of piling up.
+    """
+
+    def __init__(self, server_name: str, max_concurrency: int, max_queued: Optional[int] = None):
+        self.server_name = server_name
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.active = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+        self._avg_duration: Optional[float] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Estimate in seconds until a queued run could start."""
+        if self._avg_duration is None:
+            return 1
+        return max(1, math.ceil(self._avg_duration * (self.queued + 1) / self.max_concurrency))
+
+    async def acquire(self, block: bool = False):
+        """Wait for a run slot.
+
+        Args:
+            block: If True, wait even when the queue is full
+
+        Raises:
+            ServerBusy: If the queue is full and ``block`` is not set
+        """
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+
+        if not block and self.max_queued is not None and self.queued >= self.max_queued:
+            raise ServerBusy(self.server_name, self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed to us just as we were cancelled
+                self._release_slot()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, duration: Optional[float] = None):
+        """Give a run slot back, recording how long the run took."""
+        if duration is not None:
+            if self._avg_duration is None:
+                self._avg_duration = duration
+            else:
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+        self._release_slot()
+
+    def _release_slot(self):
+        # Hand the slot straight to the oldest waiter so it can't be taken
+        # by a newcomer in between, unless the limit was lowered meanwhile
+        while self._waiters and self.active <= self.max_concurrency:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, block: bool = False):
+        """Hold a run slot for the duration of a ``with`` block."""
+        await self.acquire(block)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+
+class _PooledClient:
+    """An initialized MCP client together with its bookkeeping."""
+
+    def __init__(self, key: Tuple[str, str], client: "MCPClient", generation: int = 0):
+        self.key = key
+        self.client = client
+        self.generation = generation
+        self.last_used = time.monotonic()
+
+    @property
+    def server_name(self) -> str:
+        return self.key[0]
+
+    def is_alive(self) -> bool:
+        """Check whether the underlying session is still connected."""
+        session = self.client.sessions.get(self.server_name) if self.client.sessions else None
+        if session is None:
+            return False
+        return bool(getattr(session, "is_connected", True))
+
+
+def _combine_clients(servers: Dict[str, Dict[str, Any]], leased: List[_PooledClient]) -> "MCPClient":
+    """Build a client exposing the sessions of several pooled clients.
+
+    The combined client only borrows the sessions; it must not be closed,
+    since the sessions still belong to their pooled clients.
+
+    Raises:
+        ValueError: If several of the servers provide a tool of the same
+            name, which the agent could not tell apart
+    """
+    from mcp_use import MCPClient
+
+    providers: Dict[str, List[str]] = {}
+    for pooled in leased:
+        connector = pooled.client.sessions[pooled.server_name].connector
+        for tool in getattr(connector, "tools", None) or []:
+            providers.setdefault(tool.name, []).append(pooled.server_name)
+    clashes = [f"'{tool}' ({', '.join(names)})" for tool, names in providers.items() if len(names) > 1]
+    if clashes:
+        raise ValueError(f"Servers provide tools with the same name: {'; '.join(clashes)}. "
+                         "Query these servers separately.")
+
+    config = json.loads(json.dumps({name: client_config(launch_config(cfg)) for name, cfg in servers.items()}))
+    client = MCPClient.from_dict({"mcpServers": config})
+    client.sessions = {pooled.server_name: pooled.client.sessions[pooled.server_name] for pooled in leased}
+    if hasattr(client, "active_sessions"):
+        client.active_sessions = list(client.sessions)
+    return client
+
+
+class SessionPool:
+    """Pool of initialized MCP clients keyed by server name and config fingerprint.
+
+    Each pooled client holds exactly one connected session and is leased
+    exclusively to one caller at a time. When every client for a server is
+    in use, new clients are started up to ``max_sessions_per_server``; past
+    that, callers wait for a client to be released.
+
+    Idle clients are closed once unused for ``idle_timeout`` seconds, checked
+    every ``reap_interval`` seconds by a background task. Servers started by
+    ``prewarm()`` always keep their most recently used idle client.
+
+    A pool is bound to the event loop it is used from, because MCP sessions
+    cannot outlive their loop. Use ``get_session_pool()`` to obtain the pool
+    for the running loop.
+    """
+
+    def __init__(self, max_sessions_per_server: int = DEFAULT_MAX_SESSIONS_PER_SERVER,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, reap_interval: float = DEFAULT_REAP_INTERVAL):
+        self.max_sessions_per_server = max_sessions_per_server
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self._idle: Dict[Tuple[str, str], List[_PooledClient]] = {}
+        self._in_use: Dict[Tuple[str, str], int] = {}
+        self._generations: Dict[str, int] = {}
+        self._condition = asyncio.Condition()
+        self._limiters: Dict[str, ServerLimiter] = {}
+        self._prewarmed: Set[str] = set()
+        self._reaper: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def configure(self, settings: Dict[str, Any]):
+        """Apply the ``sessionPool`` settings of the config file.
+
+        The new limits apply to later leases; clients already running stay
+        until they expire under the new idle timeout.
+
+        Raises:
+            ValueError: If the settings are invalid
+        """
+        self.max_sessions_per_server, self.idle_timeout = validate_pool_settings(settings)
+
+    def _max_sessions(self, server_name: str, server_config: Dict[str, Any]) -> int:
+        return validate_server_limits(server_name, server_config)[0] or self.max_sessions_per_server
+
+    def limiter(self, server_name: str, server_config: Dict[str, Any]) -> ServerLimiter:
+        """Get the admission limiter for a server, applying its configured limits.
+
+        Servers can set ``maxConcurrency`` (default: the pool's per-server
+        session limit) and ``maxQueued`` (default: unbounded) in their config.
+
+        Raises:
+            ValueError: If the configured limits are invalid
+        """
+        max_concurrency = self._max_sessions(server_name, server_config)
+        max_queued = validate_server_limits(server_name, server_config)[1]
+        limiter = self._limiters.get(server_name)
+        if limiter is None:
+            limiter = ServerLimiter(server_name, max_concurrency, max_queued)
+            self._limiters[server_name] = limiter
+        else:
+            limiter.max_concurrency = max_concurrency
+            limiter.max_queued = max_queued
+        return limiter
+
+    async def _create(self, key: Tuple[str, str], server_config: Dict[str, Any]) -> _PooledClient:
+        """Start the server and initialize a session for it."""
+        # Imported here since mcp_use pulls in langchain at import time
+        from mcp_use import MCPClient
+        
+        server_name = key[0]
+        # Hand the client a private plain-JSON copy, since the caller's
+        # config may be a shared read-only view. Entries that record or
+        # replay traffic become a command running the proxy.
+        server_config = json.loads(json.dumps(client_config(launch_config(server_config))))
+        client = MCPClient.from_dict({"mcpServers": {server_name: server_config}})
+        start = time.monotonic()
+        try:
+            await client.create_session(server_name)
+        except BaseException:
+            await client.close_all_sessions()
+            raise
+        metrics.SESSION_START_DURATION.observe(time.monotonic() - start, server=server_name)
+        logger.info(f"Started pooled session for '{server_name}'")
+        return _PooledClient(key, client, self._generations.get(server_name, 0))
+
+    async def _dispose(self, pooled: _PooledClient):
+        """Close a pooled client, ignoring errors from dead sessions."""
+        start = time.monotonic()
+        try:
+            await pooled.client.close_all_sessions()
+        except Exception as e:
+            logger.warning(f"Error closing session for '{pooled.server_name}': {e}")
+        metrics.SESSION_CLOSE_DURATION.observe(time.monotonic() - start, server=pooled.server_name)
+
+    async def acquire(self, server_name: str, server_config: Dict[str, Any]) -> _PooledClient:
+        """Lease a client for ``server_name``, starting one if needed."""
+        if self._closed:
+            raise RuntimeError("Session pool is closed")
+        self._start_reaper()
+
+        key = (server_name, server_fingerprint(server_config))
+        leased = None
+        dead = []
+        async with self._condition:
+            while leased is None:
+                idle = self._idle.get(key, [])
+                while idle:
+                    pooled = idle.pop()
+                    if pooled.is_alive():
+                        self._in_use[key] = self._in_use.get(key, 0) + 1
+                        leased = pooled
+                        break
+                    dead.append(pooled)
+                if leased is not None:
+                    break
+
+                if self._in_use.get(key, 0) < self._max_sessions(server_name, server_config):
+                    # Reserve the slot before starting so concurrent callers
+                    # don't overshoot the limit while we wait on the server
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+
+                await self._condition.wait()
+
+        # Closing dead clients can be slow, so it happens outside the lock
+        for pooled in dead:
+            await self._dispose(pooled)
+        if leased is not None:
+            return leased
+
+        try:
+            return await self._create(key, server_config)
+        except BaseException:
+            async with self._condition:
+                self._in_use[key] -= 1
+                self._condition.notify_all()
+            raise
+
+    async def release(self, pooled: _PooledClient, discard: bool = False):
+        """Return a leased client to the pool, or close it if ``discard`` is set.
+
+        Clients of a server invalidated while they were leased are closed too.
+        """
+        key = pooled.key
+        discard = (discard or self._closed or not pooled.is_alive()
+                   or pooled.generation != self._generations.get(pooled.server_name, 0))
+        if discard:
+            await self._dispose(pooled)
+        else:
+            pooled.last_used = time.monotonic()
+
+        async with self._condition:
+            self._in_use[key] = max(self._in_use.get(key, 0) - 1, 0)
+            if not discard:
+                self._idle.setdefault(key, []).append(pooled)
+            self._condition.notify_all()
+
+        await self._evict_idle()
+
+    @asynccontextmanager
+    async def session(self, server_name: str, server_config: Dict[str, Any]):
+        """Lease a client for the duration of a ``with`` block.
+
+        The client is returned to the pool when the block exits, even if it
+        raised, unless the error may have broken the session (see
+        ``session_broken``); then the client is closed.
+
+        Yields:
+            An ``MCPClient`` with an initialized session for ``server_name``.
+        """
+        pooled = await self.acquire(server_name, server_config)
+        try:
+            yield pooled.client
+        except BaseException as e:
+            await self.release(pooled, discard=session_broken(e))
+            raise
+        else:
+            await self.release(pooled)
+
+    @asynccontextmanager
+    async def sessions(self, servers: Dict[str, Dict[str, Any]]):
+        """Lease clients for several servers at once, combined into one client.
+
+        The servers are started or taken from the pool concurrently. On exit
+        every lease is returned, or closed if the block raised an error that
+        may have broken the sessions, as with ``session()``.
+
+        Yields:
+            An ``MCPClient`` with an initialized session for each server. With
+            a single server this is the pooled client itself.
+        """
+        tasks = [asyncio.ensure_future(self.acquire(name, config)) for name, config in servers.items()]
+        try:
+            await asyncio.wait(tasks)
+        except BaseException:
+            # Cancelled while starting; give back whatever was leased already
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks)
+            for task in tasks:
+                if not task.cancelled() and task.exception() is None:
+                    await self.release(task.result())
+            raise
+
+        leased = [task.result() for task in tasks if task.exception() is None]
+        if len(leased) < len(tasks):
+            for pooled in leased:
+                await self.release(pooled)
+            raise next(task.exception() for task in tasks if task.exception() is not None)
+
+        try:
+            yield leased[0].client if len(leased) == 1 else _combine_clients(servers, leased)
+        except BaseException as e:
+            broken = session_broken(e)
+            for pooled in leased:
+                await self.release(pooled, discard=broken)
+            raise
+        else:
+            for pooled in leased:
+                await self.release(pooled)
+
+    @asynccontextmanager
+    async def admit(self, servers: Dict[str, Dict[str, Any]], block: bool = False):
+        """Hold a run slot on the limiter of every server in ``servers``.
+
+        Slots are taken in name order, so runs over overlapping sets of
+        servers can't deadlock waiting on each other.
+
+        Raises:
+            ServerBusy: If any server's queue is full and ``block`` is not set
+        """
+        async with AsyncExitStack() as stack:
+            for name in sorted(servers):
+                await stack.enter_async_context(self.limiter(name, servers[name]).slot(block))
+            yield
+
+    def _start_reaper(self):
+        if self._reaper is None and self.idle_timeout is not None:
+            self._reaper = asyncio.ensure_future(self._reap())
+
+    async def _reap(self):
+        """Evict expired idle clients periodically, so they go away even without traffic."""
+        while True:
+            await asyncio.sleep(min(self.reap_interval, self.idle_timeout))
+            try:
+                await self._evict_idle()
+            except Exception as e:
+                logger.warning(f"Error evicting idle sessions: {e}")
+
+    async def _evict_idle(self):
+        """Close idle clients that have not been used within ``idle_timeout``."""
+        if self.idle_timeout is None:
+            return
+
+        now = time.monotonic()
+        expired = []
+        async with self._condition:
+            for key, idle in self._idle.items():
+                # The last released client is the most recently used one
+                kept = idle[-1] if idle and key[0] in self._prewarmed else None
+                keep = []
+                for pooled in idle:
+                    if pooled is not kept and now - pooled.last_used > self.idle_timeout:
+                        expired.append(pooled)
+                    else:
+                        keep.append(pooled)
+                self._idle[key] = keep
+
+        for pooled in expired:
+            await self._dispose(pooled)
+
+    async def prewarm(self, servers: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[BaseException]]:
+        """Start one session for each server concurrently and park it in the pool.
+
+        Servers that started keep at least one session from then on, however
+        long it stays idle.
+
+        Args:
+            servers: Mapping of server name to server configuration
+
+        Returns:
+            A mapping of server name to ``None`` on success, or the exception
+            that prevented the server from starting.
+        """
+        async def warm(server_name: str, server_config: Dict[str, Any]):
+            pooled = await self.acquire(server_name, server_config)
+            await self.release(pooled)
+
+        names = list(servers)
+        results = await asyncio.gather(
+            *(warm(name, servers[name]) for name in names),
+            return_exceptions=True
+        )
+        self._prewarmed.update(name for name, result in zip(names, results) if not isinstance(result, BaseException))
+        return {
+            name: result if isinstance(result, BaseException) else None
+            for name, result in zip(names, results)
+        }
+
+    async def invalidate(self, server_name: str):
+        """Close all clients for a server, e.g. after its config changed or it was removed.
+
+        Idle clients are closed right away, and leased ones when they are
+        released.
+        """
+        self._generations[server_name] = self._generations.get(server_name, 0) + 1
+        async with self._condition:
+            stale = []
+            for key in [k for k in self._idle if k[0] == server_name]:
+                stale.extend(self._idle.pop(key))
+
+        for pooled in stale:
+            await self._dispose(pooled)
+
+    async def close(self):
+        """Close every idle client and refuse new leases.
+
+        Clients still leased are closed when they are released.
+        """
+        self._closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        async with self._condition:
+            idle = [pooled for clients in self._idle.values() for pooled in clients]
+            self._idle.clear()
+            self._condition.notify_all()
+
+        for pooled in idle:
+            await self._dispose(pooled)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return idle and leased clients, and active and queued runs, per server."""
+        stats: Dict[str, Dict[str, int]] = {}
+
+        def entry(server_name):
+            return stats.setdefault(server_name, {"idle": 0, "in_use": 0, "active": 0, "queued": 0})
+
+        for (server_name, _), idle in self._idle.items():
+            entry(server_name)["idle"] += len(idle)
+        for (server_name, _), count in self._in_use.items():
+            entry(server_name)["in_use"] += count
+        for server_name, limiter in self._limiters.items():
+            entry(server_name)["active"] = limiter.active
+            entry(server_name)["queued"] = limiter.queued
+        return stats
+
+
+# One pool per event loop, since sessions are bound to the loop that created them
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SessionPool]" = weakref.WeakKeyDictionary()
+
+# Settings given on the command line, which take precedence over the config file
+_settings_overrides: Dict[str, Any] = {}
+
+
+def set_session_pool_overrides(settings: Dict[str, Any]):
+    """Override ``sessionPool`` settings of the config file for every pool, e.g. from command line options.
+
+    Raises:
+        ValueError: If the settings are invalid
+    """
+    validate_pool_settings(settings)
+    _settings_overrides.clear()
+    _settings_overrides.update(settings)
+
+
+def get_session_pool(settings: Optional[Dict[str, Any]] = None) -> SessionPool:
+    """Get the session pool for the running event loop, creating it if needed.
+
+    Args:
+        settings: The ``sessionPool`` section of the config file, applied to
+            the pool even if it exists already; None keeps the pool's
+            current settings
+
+    Raises:
+        ValueError: If the settings are invalid
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None or pool._closed:
+        pool = SessionPool()
+        _pools[loop] = pool
+        if settings is None:
+            settings = {}
+    if settings is not None:
+        pool.configure(dict(settings, **_settings_overrides))
+    return pool
+
+
+async def close_session_pool():
+    """Close the session pool for the running event loop, if any."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.pop(loop, None)
+    if pool is not None:
+        await pool.close()
@@ -0,0 +1,102 @@
+"""
+Long-lived asyncio runtime for synchronous front ends.
+
+The API server and the GUI handle requests on ordinary threads. Instead of
+creating an event loop per request, they submit coroutines to a single
+event loop running in a background thread. Async resources such as pooled
+MCP sessions are bound to that loop and therefore outlive any one request,
+and concurrent queries share the loop rather than each needing their own.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRuntime:
+    """An event loop running forever in a dedicated daemon thread."""
+
+    def __init__(self, name: str = "mcp-cli-runtime"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The runtime's event loop, started on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def submit(self, coroutine: Awaitable[Any]) -> "concurrent.futures.Future":
+        """Schedule a coroutine on the runtime and return a future for its result.
+
+        Cancelling the returned future cancels the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the runtime and block until it finishes."""
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 10.0):
+        """Close pooled sessions and LLM clients, stop the loop and its thread, and flush traces."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+
+        if loop is None or not loop.is_running():
+            return
+
+        # Imported here to keep this module free of MCP dependencies
+        from mcp_cli.core import close_llm_registry, close_session_pool, get_tool_cache, shutdown_tracing
+
+        async def close():
+            await get_tool_cache().wait_for_refreshes()
+            await close_session_pool()
+            await close_llm_registry()
+
+        try:
+            asyncio.run_coroutine_threadsafe(close(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Error closing sessions: {e}")
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        shutdown_tracing()
+        if not loop.is_running():
+            loop.close()
+
+
+_runtime: Optional[AsyncRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> AsyncRuntime:
+    """Get the process-wide runtime shared by the API server and the GUI."""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AsyncRuntime()
+        return _runtime
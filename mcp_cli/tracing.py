@@ -0,0 +1,384 @@
+"""
+Request tracing for MCP CLI.
+
+Every query gets a ``Trace``: a root span for the query with child spans
+for admission, session setup, each agent step, each LLM call (with token
+counts) and each tool call (with argument and result sizes). Finished
+spans are handed to a background thread that exports them in batches, so
+a query never waits on disk or network I/O for its trace.
+
+Tracing is enabled with a ``tracing`` section in the config file::
+
+    "tracing": {"exporter": "jsonl"}
+    "tracing": {"exporter": "otlp", "endpoint": "http://localhost:4318"}
+
+The JSONL exporter writes one span per line to a rotating file
+(``path``, ``maxBytes``, ``backupCount``). The OTLP exporter posts spans
+to an OpenTelemetry collector using OTLP/HTTP with JSON encoding
+(``endpoint``, ``headers``, ``timeout``).
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from mcp_cli.events import ToolCallMiddleware
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+
+def new_trace_id() -> str:
+    """Return a random 128-bit trace id as 32 hex digits."""
+    return secrets.token_hex(16)
+
+
+def trace_id_from_traceparent(header: Optional[str]) -> Optional[str]:
+    """Extract the trace id from a W3C ``traceparent`` header, if it is valid."""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if match is None or match.group(1) == "0" * 32:
+        return None
+    return match.group(1)
+
+
+def payload_size(value: Any) -> int:
+    """Return the size in bytes of a value serialized as JSON."""
+    if hasattr(value, "model_dump_json"):
+        try:
+            return len(value.model_dump_json().encode("utf-8"))
+        except Exception:
+            pass
+    return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+@dataclass
+class Span:
+    """A timed operation within a trace."""
+    trace_id: str
+    name: str
+    span_id: str = field(default_factory=lambda: secrets.token_hex(8))
+    parent_id: Optional[str] = None
+    start_time: float = field(default_factory=time.time)
+    end_time: Optional[float] = None
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def end(self, status: Optional[str] = None, end_time: Optional[float] = None):
+        if status is not None:
+            self.status = status
+        self.end_time = end_time or time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the span to a JSON-serializable dictionary."""
+        data = asdict(self)
+        data["duration"] = (self.end_time or time.time()) - self.start_time
+        return data
+
+
+class Trace:
+    """The spans of one query, sent to ``processor`` as they finish.
+
+    With no processor, spans are still created (so callers always get a
+    trace id) but are discarded.
+    """
+
+    def __init__(self, name: str, trace_id: Optional[str] = None,
+                 processor: Optional["SpanProcessor"] = None, **attributes: Any):
+        self.trace_id = trace_id or new_trace_id()
+        self.processor = processor
+        self.root = Span(self.trace_id, name, attributes=dict(attributes))
+        self._step: Optional[Span] = None
+        self._steps = 0
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """Start a span under ``parent``, or under the root span."""
+        return Span(self.trace_id, name, parent_id=(parent or self.root).span_id, attributes=dict(attributes))
+
+    def end_span(self, span: Span, status: Optional[str] = None):
+        """End a span and hand it to the processor."""
+        span.end(status)
+        if self.processor is not None:
+            self.processor.submit(span)
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes: Any):
+        """Trace a ``with`` block as a span; an exception marks it as an error."""
+        span = self.start_span(name, parent, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = str(e) or type(e).__name__
+            self.end_span(span, "error")
+            raise
+        self.end_span(span)
+
+    def record(self, name: str, duration: float, **attributes: Any) -> Span:
+        """Record a span that ended just now and lasted ``duration`` seconds."""
+        now = time.time()
+        span = self.start_span(name, **attributes)
+        span.start_time = now - duration
+        self.end_span(span)
+        return span
+
+    def next_step(self) -> Span:
+        """End the current agent step, if any, and start the next one."""
+        self.end_step()
+        self._steps += 1
+        self._step = self.start_span("agent.step", step=self._steps)
+        return self._step
+
+    @property
+    def step(self) -> Optional[Span]:
+        return self._step
+
+    def end_step(self):
+        if self._step is not None:
+            self.end_span(self._step)
+            self._step = None
+
+    def finish(self, status: str = "ok", **attributes: Any):
+        """End the open step and the root span."""
+        self.end_step()
+        self.root.attributes.update(attributes)
+        self.root.attributes["agent.steps"] = self._steps
+        self.end_span(self.root, status)
+
+
+class JsonlExporter:
+    """Write spans as JSON lines to a size-rotated file."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            self._handler.emit(logging.makeLogRecord({"msg": json.dumps(span.to_dict(), default=str)}))
+
+    def close(self):
+        self._handler.close()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter:
+    """Post spans to an OpenTelemetry collector over OTLP/HTTP with JSON encoding."""
+
+    def __init__(self, endpoint: str, headers: Optional[Dict[str, str]] = None, timeout: float = 10.0,
+                 service_name: str = "mcp-cli"):
+        endpoint = endpoint.rstrip("/")
+        self.url = endpoint if endpoint.endswith("/v1/traces") else endpoint + "/v1/traces"
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+        self.service_name = service_name
+
+    def _span(self, span: Span) -> Dict[str, Any]:
+        data = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(int(span.start_time * 1e9)),
+            "endTimeUnixNano": str(int((span.end_time or span.start_time) * 1e9)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2 if span.status == "error" else 1}
+        }
+        if span.parent_id:
+            data["parentSpanId"] = span.parent_id
+        return data
+
+    def export(self, spans: List[Span]):
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "mcp_cli"}, "spans": [self._span(span) for span in spans]}]
+            }]
+        }
+        request = urllib.request.Request(self.url, data=json.dumps(body).encode("utf-8"),
+                                         headers=self.headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def close(self):
+        pass
+
+
+class SpanProcessor:
+    """Queue finished spans and export them in batches from a background thread.
+
+    ``submit`` never blocks: when the queue is full, spans are dropped and
+    counted in ``dropped``. Export errors are logged and the batch is lost.
+    """
+
+    def __init__(self, exporter, max_queue: int = DEFAULT_QUEUE_SIZE, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="mcp-cli-tracing", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+    def shutdown(self, timeout: float = 5.0):
+        """Export the spans still queued, then stop the thread."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self.exporter.close()
+
+
+def create_exporter(settings: Dict[str, Any], default_path: str):
+    """Create the exporter described by a ``tracing`` config section.
+
+    Raises:
+        ValueError: If the exporter type is unknown or misconfigured
+    """
+    kind = settings.get("exporter", "jsonl")
+    if kind == "jsonl":
+        return JsonlExporter(
+            settings.get("path") or default_path,
+            max_bytes=settings.get("maxBytes", DEFAULT_MAX_BYTES),
+            backup_count=settings.get("backupCount", DEFAULT_BACKUP_COUNT)
+        )
+    if kind == "otlp":
+        if not settings.get("endpoint"):
+            raise ValueError("The OTLP trace exporter needs an 'endpoint'")
+        return OtlpHttpExporter(settings["endpoint"], headers=settings.get("headers"),
+                                timeout=settings.get("timeout", 10.0))
+    raise ValueError(f"Unknown trace exporter '{kind}'")
+
+
+def tool_trace_middleware(trace: Trace) -> ToolCallMiddleware:
+    """Create a middleware that traces every tool call under the current agent step."""
+    async def middleware(server_name, name, arguments, call_next):
+        span = trace.start_span("tool.call", parent=trace.step, **{
+            "mcp.server": server_name,
+            "mcp.tool": name,
+            "mcp.arguments.size": payload_size(arguments)
+        })
+        try:
+            result = await call_next(name, arguments)
+        except BaseException as e:
+            span.attributes["error"] = str(e) or type(e).__name__
+            trace.end_span(span, "error")
+            raise
+        span.attributes["mcp.result.size"] = payload_size(result)
+        trace.end_span(span, "error" if getattr(result, "isError", False) else None)
+        return result
+    return middleware
+
+
+def _token_usage(response) -> Dict[str, int]:
+    """Read token counts from a LangChain ``LLMResult``."""
+    usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    if usage:
+        return {
+            "llm.tokens.prompt": usage.get("prompt_tokens", 0),
+            "llm.tokens.completion": usage.get("completion_tokens", 0),
+            "llm.tokens.total": usage.get("total_tokens", 0)
+        }
+    # Streaming responses report usage on the message instead
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                return {
+                    "llm.tokens.prompt": metadata.get("input_tokens", 0),
+                    "llm.tokens.completion": metadata.get("output_tokens", 0),
+                    "llm.tokens.total": metadata.get("total_tokens", 0)
+                }
+    return {}
+
+
+def trace_callback_handler(trace: Trace, model: str):
+    """Create a LangChain callback handler that traces agent steps and LLM calls.
+
+    Each LLM call starts a new agent step; the tool calls that follow are
+    traced under that step.
+    """
+    # Imported here since langchain is only needed once an agent runs
+    from langchain_core.callbacks import AsyncCallbackHandler
+
+    class TraceHandler(AsyncCallbackHandler):
+        def __init__(self):
+            self.spans: Dict[Any, Span] = {}
+
+        def _start(self, run_id):
+            step = trace.next_step()
+            self.spans[run_id] = trace.start_span("llm.call", parent=step, **{"llm.model": model})
+
+        async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs: Any) -> None:
+            self._start(run_id)
+
+        async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs: Any) -> None:
+            self._start(run_id)
+
+        async def on_llm_end(self, response, *, run_id, **kwargs: Any) -> None:
+            span = self.spans.pop(run_id, None)
+            if span is not None:
+                span.attributes.update(_token_usage(response))
+                trace.end_span(span)
+
+        async def on_llm_error(self, error, *, run_id, **kwargs: Any) -> None:
+            span = self.spans.pop(run_id, None)
+            if span is not None:
+                span.attributes["error"] = str(error)
+                trace.end_span(span, "error")
+
+    return TraceHandler()
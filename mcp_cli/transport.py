@@ -0,0 +1,286 @@
+"""
+Recording and replay of MCP stdio traffic.
+
+Starting real MCP servers (usually through ``npx``) dominates query
+timings and needs Node and network access. This module lets a server
+entry record its JSON-RPC traffic to a log, and another entry serve the
+recorded responses back without the real server::
+
+    "filesystem": {
+      "command": "npx",
+      "args": ["-y", "@modelcontextprotocol/server-filesystem", "."],
+      "record": "filesystem"
+    },
+    "filesystem-replay": {
+      "replay": "filesystem",
+      "replaySpeed": 1
+    }
+
+Both work as stdio proxies, so they behave the same with every MCP
+client: ``client_config`` turns such an entry into a command running this
+file, which either relays traffic between the client and the real server
+while logging it (``record``), or answers requests from the log
+(``replay``). The file only uses the standard library, so it starts
+quickly and runs without ``mcp_cli`` being importable.
+
+A recording is JSON Lines. Each proxy session first writes a header, then
+one line per message with its direction (``>`` client to server, ``<``
+server to client) and the seconds since the session started::
+
+    {"s": "9f2c", "start": 1718000000.0, "command": "npx", "args": [...]}
+    {"s": "9f2c", "t": 0.002, "d": ">", "m": {"jsonrpc": "2.0", "id": 0, "method": "initialize", ...}}
+    {"s": "9f2c", "t": 1.843, "d": "<", "m": {"jsonrpc": "2.0", "id": 0, "result": {...}}}
+
+Replay answers each request with the response recorded for the same
+method and parameters, after the time the server originally took divided
+by ``replaySpeed`` (0 answers immediately). Repeated identical requests
+cycle through their recorded responses. A ``tools/call`` whose arguments
+were never recorded gets a recorded response of the same tool.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+RECORD_KEY = "record"
+REPLAY_KEY = "replay"
+REPLAY_SPEED_KEY = "replaySpeed"
+
+# JSON-RPC error codes
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+
+def recording_path(name: str) -> str:
+    """Resolve a recording name to its file.
+
+    A bare name refers to ``recordings/mcp/<name>.jsonl`` under the config
+    directory; anything that looks like a path is used as is.
+    """
+    if os.sep in name or "/" in name or name.endswith(".jsonl"):
+        return os.path.abspath(os.path.expanduser(name))
+    # Imported here so that this file also runs as a standalone script
+    from mcp_cli.core import get_config_dir
+
+    return os.path.join(get_config_dir(), "recordings", "mcp", f"{name}.jsonl")
+
+
+def client_config(server_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the configuration to hand to the MCP client for a server entry.
+
+    Entries with ``replay`` run the replayer instead of a command, and
+    entries with ``record`` run their command behind the recorder. Other
+    entries are returned unchanged.
+    """
+    config = {key: value for key, value in server_config.items()
+              if key not in (RECORD_KEY, REPLAY_KEY, REPLAY_SPEED_KEY)}
+    script = os.path.abspath(__file__)
+    if server_config.get(REPLAY_KEY):
+        config["command"] = sys.executable
+        config["args"] = [script, "replay", recording_path(server_config[REPLAY_KEY]),
+                          "--speed", str(server_config.get(REPLAY_SPEED_KEY, 1.0))]
+    elif server_config.get(RECORD_KEY):
+        config["args"] = [script, "record", recording_path(server_config[RECORD_KEY]), "--",
+                          config.get("command", ""), *config.get("args", [])]
+        config["command"] = sys.executable
+    return config
+
+
+class TrafficLog:
+    """Appends the messages of one proxy session to a recording.
+
+    Lines are written with single appends, so several sessions can record
+    to the same file at once.
+    """
+
+    def __init__(self, path: str, command: str, args: List[str]):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.session = uuid.uuid4().hex[:8]
+        self.started = time.monotonic()
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._write({"s": self.session, "start": time.time(), "command": command, "args": args})
+
+    def _write(self, entry: Dict[str, Any]):
+        os.write(self._fd, (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8"))
+
+    def message(self, direction: str, line: bytes):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            # Not JSON-RPC, e.g. a server writing logs to stdout
+            message = line.decode("utf-8", "replace").rstrip("\n")
+        self._write({"s": self.session, "t": round(time.monotonic() - self.started, 6), "d": direction, "m": message})
+
+    def close(self):
+        os.close(self._fd)
+
+
+def record(path: str, command: str, args: List[str]) -> int:
+    """Run a server, relaying stdio between it and the client and logging every message."""
+    log = TrafficLog(path, command, args)
+    # On Windows, commands such as npx are batch files that Popen can't find by name
+    executable = shutil.which(command) or command
+    child = subprocess.Popen([executable] + args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def stop(signum, frame):
+        child.terminate()
+        sys.exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, stop)
+
+    def relay_requests():
+        try:
+            for line in iter(sys.stdin.buffer.readline, b""):
+                log.message(">", line)
+                child.stdin.write(line)
+                child.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                child.stdin.close()
+            except OSError:
+                pass
+
+    threading.Thread(target=relay_requests, daemon=True).start()
+    try:
+        for line in iter(child.stdout.readline, b""):
+            log.message("<", line)
+            sys.stdout.buffer.write(line)
+            sys.stdout.buffer.flush()
+    except BrokenPipeError:
+        child.terminate()
+    finally:
+        log.close()
+    return child.wait()
+
+
+def _request_key(method: str, params: Any) -> str:
+    """Key a request by method and parameters, ignoring per-request metadata."""
+    if isinstance(params, dict):
+        params = {key: value for key, value in params.items() if key != "_meta"}
+    if method == "initialize":
+        # Client names and versions differ between runs; the answer doesn't
+        params = None
+    return json.dumps([method, params], sort_keys=True, separators=(",", ":"))
+
+
+def _fallback_key(method: str, params: Any) -> str:
+    tool = params.get("name") if method == "tools/call" and isinstance(params, dict) else None
+    return json.dumps([method, tool])
+
+
+class Recording:
+    """Request/response pairs read from a recording, with their latency.
+
+    Raises:
+        OSError: If the file can't be read
+    """
+
+    def __init__(self, path: str):
+        self.exact: Dict[str, List[Tuple[float, Dict[str, Any]]]] = {}
+        self.fallback: Dict[str, List[Tuple[float, Dict[str, Any]]]] = {}
+        self._next: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+        pending: Dict[Tuple[str, str], Tuple[float, str, Any]] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                message = entry.get("m")
+                if not isinstance(message, dict) or "id" not in message:
+                    continue
+                key = (entry.get("s"), json.dumps(message["id"]))
+                if entry.get("d") == ">" and "method" in message:
+                    pending[key] = (entry.get("t", 0.0), message["method"], message.get("params"))
+                elif entry.get("d") == "<" and "method" not in message and key in pending:
+                    start, method, params = pending.pop(key)
+                    answer = {name: message[name] for name in ("result", "error") if name in message}
+                    pair = (max(0.0, entry.get("t", 0.0) - start), answer)
+                    self.exact.setdefault(_request_key(method, params), []).append(pair)
+                    self.fallback.setdefault(_fallback_key(method, params), []).append(pair)
+
+    def find(self, method: str, params: Any) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Get the next recorded answer to a request, as ``(latency, answer)``, or None."""
+        for table, key in ((self.exact, _request_key(method, params)), (self.fallback, _fallback_key(method, params))):
+            answers = table.get(key)
+            if answers:
+                with self._lock:
+                    index = self._next.get((id(table), key), 0)
+                    self._next[(id(table), key)] = index + 1
+                return answers[index % len(answers)]
+        return None
+
+
+def replay(path: str, speed: float = 1.0) -> int:
+    """Answer requests on stdin from a recording, as the recorded server did."""
+    recording = Recording(path)
+    write_lock = threading.Lock()
+
+    def send(message: Dict[str, Any]):
+        with write_lock:
+            sys.stdout.write(json.dumps(message, separators=(",", ":")) + "\n")
+            sys.stdout.flush()
+
+    def answer(request_id: Any, latency: float, reply: Dict[str, Any]):
+        if speed > 0 and latency > 0:
+            time.sleep(latency / speed)
+        send(dict({"jsonrpc": "2.0", "id": request_id}, **reply))
+
+    for line in sys.stdin:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(message, dict) or "method" not in message or "id" not in message:
+            # Notifications and responses to server requests need no answer
+            continue
+        method = message["method"]
+        if method == "ping":
+            send({"jsonrpc": "2.0", "id": message["id"], "result": {}})
+            continue
+        found = recording.find(method, message.get("params"))
+        if found is None:
+            code = INTERNAL_ERROR if method == "tools/call" else METHOD_NOT_FOUND
+            found = (0.0, {"error": {"code": code, "message": f"No recorded response for {method}"}})
+        # Answer from a thread so concurrent requests overlap as they did when recorded
+        threading.Thread(target=answer, args=(message["id"],) + found, daemon=True).start()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Record or replay the stdio traffic of an MCP server")
+    subparsers = parser.add_subparsers(dest="mode")
+
+    record_parser = subparsers.add_parser("record", help="Run a server and record its traffic")
+    record_parser.add_argument("path", help="Recording to append to")
+    record_parser.add_argument("command", help="Server command")
+    record_parser.add_argument("args", nargs=argparse.REMAINDER, help="Server arguments")
+
+    replay_parser = subparsers.add_parser("replay", help="Serve the responses of a recording")
+    replay_parser.add_argument("path", help="Recording to replay")
+    replay_parser.add_argument("--speed", type=float, default=1.0,
+                               help="Divide recorded response times by this factor; 0 answers immediately")
+
+    args = parser.parse_args(argv)
+    if args.mode == "record":
+        return record(args.path, args.command, args.args)
+    if args.mode == "replay":
+        return replay(args.path, args.speed)
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
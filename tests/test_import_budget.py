@@ -0,0 +1,49 @@
+"""
+Import-time regression test for the ``mcp`` command.
+
+Config-only commands such as ``mcp list`` must not pay for PyQt5,
+langchain or the MCP client, which are loaded on first use instead.
+Importing ``mcp_cli.cli`` is checked in a fresh interpreter, so modules
+imported by the test run itself don't hide a regression.
+
+The time budget can be raised on slow machines with
+``MCP_CLI_IMPORT_BUDGET_MS``.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["PyQt5", "langchain_openai", "mcp_use", "flask", "httpx"]
+DEFAULT_IMPORT_BUDGET_MS = 500
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable] + list(args),
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def test_cli_import_skips_heavy_modules():
+    script = (
+        "import json, sys\n"
+        "import mcp_cli.cli\n"
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))\n"
+    )
+    loaded = json.loads(run_python("-c", script).stdout)
+    assert loaded == [], f"Importing mcp_cli.cli loaded {', '.join(loaded)}"
+
+
+def test_cli_import_time_within_budget():
+    budget_ms = float(os.environ.get("MCP_CLI_IMPORT_BUDGET_MS", DEFAULT_IMPORT_BUDGET_MS))
+    # -X importtime reports the cumulative microseconds of each import on stderr
+    report = run_python("-X", "importtime", "-c", "import mcp_cli.cli").stderr
+    match = re.search(r"^import time:\s*\d+ \|\s*(\d+) \| mcp_cli\.cli$", report, re.MULTILINE)
+    assert match, "No import time reported for mcp_cli.cli"
+    elapsed_ms = int(match.group(1)) / 1000
+    assert elapsed_ms <= budget_ms, f"Importing mcp_cli.cli took {elapsed_ms:.0f}ms, over the {budget_ms:.0f}ms budget"